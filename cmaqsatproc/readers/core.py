@@ -1,7 +1,180 @@
 __all__ = ['satellite']
 
 from ..utils import EasyDataFramePolygon, grouped_weighted_avg, rootremover
-from ..utils import csp_version
+from ..utils import csp_version, _accumulated_avg
+
+# Grid and grid index shared by paths_to_level3 worker processes
+_worker_grid = None
+_worker_grid_tree = None
+
+
+# xarray.open_dataset keywords that are applied by xarray.decode_cf
+_decode_keys = (
+    'mask_and_scale', 'decode_times', 'decode_timedelta', 'use_cftime',
+    'concat_characters', 'decode_coords'
+)
+
+
+def _pop_decode_kwargs(kwargs):
+    """
+    Remove CF decoding options from open_dataset keywords so that a reader
+    can open with decode_cf=False and decode later with xarray.decode_cf.
+
+    Arguments
+    ---------
+    kwargs : dict
+        Keywords for xarray.open_dataset; modified in place
+
+    Returns
+    -------
+    decode_cf, decodekw : bool, dict
+        Whether to decode and keywords for xarray.decode_cf
+    """
+    decode_cf = kwargs.pop('decode_cf', True)
+    decodekw = {k: kwargs.pop(k) for k in _decode_keys if k in kwargs}
+    return decode_cf, decodekw
+
+
+def _default_chunks(kwargs):
+    """
+    If dask is available, default open_dataset keywords to chunks={} so that
+    variables are read lazily and only requested variables are loaded.
+
+    Arguments
+    ---------
+    kwargs : dict
+        Keywords for xarray.open_dataset; modified in place
+
+    Returns
+    -------
+    None
+    """
+    try:
+        import dask  # noqa: F401
+    except ImportError:
+        return
+    kwargs.setdefault('chunks', {})
+
+
+def _make_grid_tree(grid):
+    """
+    Build a spatial index of grid geometries, repairing invalid geometries
+    first. The repaired geometries are available as tree.geometries and are
+    prepared so that predicates against them are fast.
+    """
+    import numpy as np
+    import shapely
+
+    gridgeoms = np.asarray(grid.geometry.values)
+    gridinvalid = ~shapely.is_valid(gridgeoms)
+    if gridinvalid.any():
+        gridgeoms = gridgeoms.copy()
+        gridgeoms[gridinvalid] = shapely.make_valid(gridgeoms[gridinvalid])
+    shapely.prepare(gridgeoms)
+    return shapely.STRtree(gridgeoms)
+
+
+def _any_positions(mask, dims):
+    """
+    For each dimension of a boolean array, the positions where any element
+    is True. Useful for cropping with isel.
+    """
+    import numpy as np
+
+    mask = np.asarray(mask, dtype=bool)
+    isel = {}
+    for di, dim in enumerate(dims):
+        otheraxes = tuple(i for i in range(mask.ndim) if i != di)
+        isel[dim] = np.flatnonzero(mask.any(axis=otheraxes))
+    return isel
+
+
+def _in_bbox(bbox, x, y):
+    """
+    Identify points (e.g., pixel centers) within bbox.
+
+    Arguments
+    ---------
+    bbox : iterable or shapely geometry
+        swlon, swlat, nelon, nelat in decimal degrees East and North, or a
+        geometry (e.g., a polygon) in decimal degrees
+    x, y : numpy.ndarray
+        Longitude and latitude of points
+
+    Returns
+    -------
+    inbbox : numpy.ndarray
+        True where the point is within or on the boundary of bbox
+    """
+    geom = bbox if hasattr(bbox, 'geom_type') else None
+    if geom is not None:
+        bbox = geom.bounds
+    swlon, swlat, nelon, nelat = bbox
+    inbbox = (y >= swlat) & (y <= nelat) & (x >= swlon) & (x <= nelon)
+    if geom is not None:
+        import shapely
+        # The envelope test above prunes most points; only the candidates
+        # get the exact test against the prepared geometry.
+        shapely.prepare(geom)
+        inbbox[inbbox] = shapely.intersects_xy(geom, x[inbbox], y[inbbox])
+    return inbbox
+
+
+def _pad_dataset(ds, pad):
+    """
+    Pad ds at the end of dimensions with missing values; boolean variables
+    (e.g., valid) are padded with False so that padding is never used.
+
+    Arguments
+    ---------
+    ds : xarray.Dataset
+        Dataset to pad
+    pad : mappable
+        Dimension to (before, after) pad widths
+
+    Returns
+    -------
+    pds : xarray.Dataset
+    """
+    if len(pad) == 0:
+        return ds
+    pds = ds.pad(pad)
+    for key, var in ds.data_vars.items():
+        if var.dtype == bool:
+            vpad = {k: v for k, v in pad.items() if k in var.dims}
+            pds[key] = var.pad(vpad, constant_values=False)
+    return pds
+
+
+def _init_worker(grid):
+    global _worker_grid, _worker_grid_tree
+    _worker_grid = grid
+    _worker_grid_tree = _make_grid_tree(grid)
+
+
+def _process_one(
+    cls, path, grid, bbox, varkeys, l3kwargs, kwargs, grid_tree=None
+):
+    """
+    Open path and convert it to level3 for paths_to_level3. When grid is
+    None, the grid (and grid_tree) stored by _init_worker is used.
+
+    Returns
+    -------
+    output, attrs : dict, dict
+        Output of to_level3 (as_dataset=False) and attributes of each
+        variable in the source dataset.
+    """
+    if grid is None:
+        grid = _worker_grid
+        grid_tree = _worker_grid_tree
+    sat = cls.open_dataset(path, bbox=bbox, **kwargs)
+    output = sat.to_level3(
+        *varkeys, grid=grid, grid_tree=grid_tree, as_dataset=False,
+        **l3kwargs
+    )
+    attrs = {k: dict(v.attrs) for k, v in sat.ds.variables.items()}
+    return output, attrs
 
 
 class satellite:
@@ -135,7 +308,8 @@ class satellite:
             swlon, swlat, nelon, nelat in decimal degrees East and North
             of 0, 0
         kwargs : mappable
-            Passed to xarray.open_dataset
+            Passed to xarray.open_dataset. If dask is available, chunks
+            defaults to {} so that variables are read lazily.
 
         Returns
         -------
@@ -149,15 +323,72 @@ class satellite:
             import s3fs
             fs = s3fs.S3FileSystem(anon=True)
             with fs.open(path) as fileObj:
-                ds = xr.open_dataset(fileObj)
+                ds = xr.open_dataset(fileObj, **kwargs)
         else:
-            ds = xr.open_dataset(path, *kwargs)
-        sat.ds = ds
+            _default_chunks(kwargs)
+            ds = xr.open_dataset(path, **kwargs)
         if bbox is not None:
-            import warnings
-            warnings.warn(f'{cls} bbox not implemented; all cells returned')
+            bbox = tuple(bbox)
+            subds = cls._bbox_subset(ds, bbox)
+            if subds is None:
+                import warnings
+                warnings.warn(
+                    f'{cls} bbox not implemented; all cells returned'
+                )
+            else:
+                ds = subds
+            sat.bbox = bbox
+        sat.ds = ds
         return sat
 
+    @classmethod
+    def _bbox_mask(cls, ds, bbox):
+        """
+        Identify pixels whose centers are within bbox. Subclasses without
+        cn_x and cn_y can override this to use their native coordinates.
+
+        Arguments
+        ---------
+        ds : xarray.Dataset
+            Satellite dataset
+        bbox : iterable
+            swlon, swlat, nelon, nelat in decimal degrees East and North
+
+        Returns
+        -------
+        keep : xarray.DataArray or None
+            True where the pixel is in bbox; None if ds has no centers.
+        """
+        if not ('cn_x' in ds.variables and 'cn_y' in ds.variables):
+            return None
+        swlon, swlat, nelon, nelat = bbox
+        x = ds['cn_x']
+        y = ds['cn_y']
+        return (x >= swlon) & (x <= nelon) & (y >= swlat) & (y <= nelat)
+
+    @classmethod
+    def _bbox_subset(cls, ds, bbox):
+        """
+        Crop ds to the rows/columns that have pixels in bbox (using isel, so
+        dtypes are preserved) and mark remaining pixels outside bbox invalid.
+
+        Returns
+        -------
+        ds : xarray.Dataset or None
+            None if _bbox_mask is not available for ds.
+        """
+        keep = cls._bbox_mask(ds, bbox)
+        if keep is None:
+            return None
+        isel = _any_positions(keep.values, keep.dims)
+        ds = ds.isel(**isel)
+        keep = keep.isel(**isel)
+        if cls._validkey in ds.variables:
+            ds[cls._validkey] = ds[cls._validkey] & keep
+        else:
+            ds[cls._validkey] = keep
+        return ds
+
     @property
     def ds(self):
         return self._ds
@@ -165,6 +396,23 @@ class satellite:
     @ds.setter
     def ds(self, ds):
         self._ds = ds
+        # Variable attributes by name; avoids building DataArrays per lookup
+        self._attrs_cache = {k: v.attrs for k, v in ds.variables.items()}
+        # Pixel geometries by (geo, valid); see _geometry
+        self._geodfs = {}
+        # Pixel DataFrames by valid; see _pixel_frame
+        self._frames = {}
+
+    def _var_attrs(self, key):
+        """
+        Return the attributes of variable key from self.ds or None if key is
+        not a variable. Uses self._attrs_cache and falls back to self.ds for
+        variables added after ds was set.
+        """
+        attrs = self._attrs_cache.get(key)
+        if attrs is None and key in self._ds.variables:
+            attrs = self._attrs_cache[key] = self._ds.variables[key].attrs
+        return attrs
 
     def to_dataframe(self, *varkeys, valid=True, geo=False, default_keys=False):
         """
@@ -200,32 +448,231 @@ class satellite:
         else:
             keys = list(varkeys)
 
-        df = self.ds[keys].to_dataframe()
-        if valid and usevalid:
-            df = df.query('valid == True')
+        if len(varkeys) == 0 and not (geo is False):
+            # Only geometry was requested
+            return self._geometry(geo=geo, valid=valid).copy()
+
+        df = self._valid_frame(keys, valid=valid and usevalid)
         if not (geo is False):
-            if hasattr(self, '_geodf'):
-                gdf = self._geodf
-            else:
-                import geopandas as gpd
-                if geo is True:
-                    geo = self._defgeofunc
-                gdf = self.to_dataframe(*self._geokeys, valid=valid)
-                if gdf.shape[0] == 0:
-                    raise ValueError('No valid pixels')
-                gdf = gpd.GeoDataFrame(
-                    gdf, geometry=geo(gdf), crs=self._crs
-                ).drop(list(self._geokeys), axis=1)
-                self._geodf = gdf
-            df = gdf[['geometry']].join(df)
+            df = self._geometry(geo=geo, valid=valid)[['geometry']].join(df)
         if 'valid' in df.columns:
             if 'valid' not in varkeys:
                 df = df.drop('valid', axis=1)
         for key in df.columns:
-            if key in self.ds.variables:
-                df[key].attrs.update(self.ds[key].attrs)
+            attrs = self._var_attrs(key)
+            if attrs is not None:
+                df[key].attrs.update(attrs)
+        return df
+
+    def _valid_values(self):
+        """
+        Boolean numpy array of self.ds[self._validkey]. The array is cached
+        so that repeated to_dataframe calls (e.g., one per dimset in
+        to_level3) read and convert the valid variable only once. The cache
+        is refreshed if the valid variable is replaced.
+        """
+        import numpy as np
+
+        validvar = self._ds.variables[self._validkey]
+        cached = getattr(self, '_valid_cache', None)
+        if cached is None or cached[0] is not validvar:
+            cached = (validvar, np.asarray(validvar.values, dtype=bool))
+            self._valid_cache = cached
+        return cached[1]
+
+    def _valid_crop(self, ds):
+        """
+        Crop ds to the positions along each valid dimension that have any
+        valid pixel. Dimensions without an index get positional coordinates
+        first, so row labels match the uncropped dataset.
+
+        Returns
+        -------
+        ds, mask : xr.Dataset or xr.DataArray, numpy.ndarray
+            Cropped ds and the valid mask at the cropped positions
+        """
+        import numpy as np
+
+        dims = self.ds[self._validkey].dims
+        mask = self._valid_values()
+        isel = _any_positions(mask, dims)
+        ds = ds.assign_coords({
+            dim: np.arange(ds.sizes[dim]) for dim in dims
+            if dim not in ds.indexes
+        }).isel(**isel)
+        return ds, mask[np.ix_(*isel.values())]
+
+    def _valid_frame(self, keys, valid=True):
+        """
+        Create a DataFrame of keys. If valid, the variables are first cropped
+        to the extent of valid pixels (see _valid_crop), and then only valid
+        pixels are kept. When keys (and their coordinates) all have the valid
+        dimensions, columns are sliced from _pixel_frame instead of building
+        a DataFrame of every cropped pixel.
+
+        Arguments
+        ---------
+        keys : iterable
+            Variables to include as columns
+        valid : bool
+            If true, only return valid pixels.
+
+        Returns
+        -------
+        df : pandas.DataFrame
+        """
+        dims = self.ds[self._validkey].dims
+        keys = list(keys)
+        addvalid = valid and self._validkey not in keys
+        if addvalid:
+            keys.append(self._validkey)
+        sub = self.ds[keys]
+        colkeys = [k for k in sub.variables if k not in sub.dims]
+        if all(sub[k].dims == dims for k in colkeys):
+            df = self._pixel_frame(colkeys, valid=valid)
+        else:
+            if valid:
+                sub, _ = self._valid_crop(sub)
+            df = sub.to_dataframe()
+            if valid:
+                df = df[df[self._validkey].to_numpy(dtype=bool, copy=False)]
+        if addvalid:
+            df = df.drop(columns=self._validkey)
         return df
 
+    def _pixel_frame(self, keys, valid=True):
+        """
+        DataFrame of keys that all have exactly the valid dimensions. One
+        frame per valid setting is built and kept; columns are added the
+        first time they are requested and sliced after that. So the crop,
+        mask and index are made once, and each variable is read once, no
+        matter how many times geometry or dimsets ask for it (e.g., in
+        to_level3). Columns are re-read if their variable is replaced.
+
+        Arguments
+        ---------
+        keys : iterable
+            Variables with the valid dimensions
+        valid : bool
+            If true, only return valid pixels.
+
+        Returns
+        -------
+        df : pandas.DataFrame
+            Copy of the requested columns
+        """
+        import pandas as pd
+
+        validvar = self._ds.variables[self._validkey]
+        dims = validvar.dims
+        cached = self._frames.get(valid)
+        if cached is None or cached[0] is not validvar:
+            vda = self.ds[self._validkey]
+            if valid:
+                vda, mask = self._valid_crop(vda)
+                mask = mask.ravel()
+            else:
+                mask = slice(None)
+            frame = pd.DataFrame(index=vda.coords.to_index(dims)[mask])
+            cached = self._frames[valid] = (validvar, frame, {})
+        _, frame, sources = cached
+        keys = list(keys)
+        missing = [
+            k for k in keys if sources.get(k) is not self._ds.variables[k]
+        ]
+        if len(missing) > 0:
+            sub = self.ds[missing]
+            if valid:
+                sub, mask = self._valid_crop(sub)
+                mask = mask.ravel()
+            else:
+                mask = slice(None)
+            for k in missing:
+                frame[k] = sub[k].values.ravel()[mask]
+                sources[k] = self._ds.variables[k]
+        return frame[keys]
+
+    def _polygons_from_corners(self, valid=True):
+        """
+        Create default pixel polygons (see EasyDataFramePolygon) directly
+        from stacks of the corner arrays in _pixel_frame.
+
+        Arguments
+        ---------
+        valid : bool
+            If true, only return valid pixels.
+
+        Returns
+        -------
+        polys, idx : numpy.ndarray, pandas.Index
+            Polygons and pixel index or None if corners are not available on
+            the valid dimensions.
+        """
+        from ..utils import _polygons_from_xy, _xcrnrkeys, _ycrnrkeys
+
+        dims = self.ds[self._validkey].dims
+        for key in _xcrnrkeys + _ycrnrkeys:
+            if key not in self.ds.variables or self.ds[key].dims != dims:
+                return None
+        df = self._pixel_frame(_xcrnrkeys + _ycrnrkeys, valid=valid)
+        x = df[_xcrnrkeys].to_numpy()
+        y = df[_ycrnrkeys].to_numpy()
+        return _polygons_from_xy(x, y), df.index
+
+    def _build_geometry(self, geo=True, valid=True):
+        """
+        Create a GeoDataFrame of pixel geometries directly from the _geokeys
+        arrays. Unlike to_dataframe, no DataFrame of all pixels is built; the
+        valid mask is applied to the raw arrays before geometries are made.
+
+        Arguments
+        ---------
+        geo : bool or function
+            If True, use self._defgeofunc. Otherwise, a function that takes a
+            dataframe of _geokeys and returns geometries for each row.
+        valid : bool
+            If true, only return valid pixels.
+
+        Returns
+        -------
+        gdf : geopandas.GeoDataFrame
+            Has only a geometry column and is indexed by pixel dimensions.
+        """
+        import numpy as np
+        import geopandas as gpd
+
+        if geo is True:
+            if type(self)._defgeofunc is satellite._defgeofunc:
+                # Default polygons can be made without a DataFrame
+                polysidx = self._polygons_from_corners(valid=valid)
+                if polysidx is not None:
+                    polys, idx = polysidx
+                    if polys.shape[0] == 0:
+                        raise ValueError('No valid pixels')
+                    return gpd.GeoDataFrame(
+                        geometry=polys, index=idx, crs=self._crs
+                    )
+            geo = self._defgeofunc
+        geokeys = [k for k in self._geokeys if k in self.ds.variables]
+        df = self._valid_frame(geokeys, valid=valid)
+        if df.shape[0] == 0:
+            raise ValueError('No valid pixels')
+        gdf = gpd.GeoDataFrame(
+            geometry=np.asarray(geo(df)), index=df.index, crs=self._crs
+        )
+        return gdf
+
+    def _geometry(self, geo=True, valid=True):
+        """
+        Return _build_geometry(geo=geo, valid=valid). Results are cached per
+        (geo, valid), so geometry made for one set of arguments is never
+        returned for another. The cache is cleared when ds is set.
+        """
+        key = (geo, valid)
+        if key not in self._geodfs:
+            self._geodfs[key] = self._build_geometry(geo=geo, valid=valid)
+        return self._geodfs[key]
+
     @classmethod
     def add_weights(cls, intx, option='equal'):
         """
@@ -243,10 +690,13 @@ class satellite:
         -------
         None
         """
+        import numpy as np
+        import shapely
+
         if option == 'equal':
             intx['weight'] = 1
         elif option == 'area':
-            intx['weight'] = intx.geometry.area
+            intx['weight'] = shapely.area(np.asarray(intx.geometry.values))
             if (intx['weight'] == 0).all():
                 import warnings
                 warnings.warn(
@@ -269,7 +719,7 @@ class satellite:
 
     def to_level3(
         self, *varkeys, grid, griddims=None, weighting='area',
-        as_dataset=True, verbose=0
+        as_dataset=True, verbose=0, grid_tree=None
     ):
         """
         Convert variables from L2 file to a custom L3 file.
@@ -284,6 +734,10 @@ class satellite:
             Defaults to grid.index.names
         weighting : str
             Passed as option to self.add_weights
+        grid_tree : shapely.STRtree
+            Optional, index of grid geometries in grid order. Useful when the
+            same grid is used for many files (see paths_to_level3). If None,
+            the index is built from grid.
 
         Returns
         -------
@@ -291,12 +745,14 @@ class satellite:
             Dictionary of outputs by output dimensions
             or Dataset of outputs as a dataset
         """
+        import numpy as np
         import pandas as pd
         import geopandas as gpd
+        import shapely
         import time
         if len(varkeys) == 0:
             varkeys = [
-                k for k in self._defaultkeys if k in list(self.ds.data_vars)
+                k for k in self._defaultkeys if k in self.ds.data_vars
             ]
             if verbose > 0:
                 print('defaults', varkeys)
@@ -321,7 +777,7 @@ class satellite:
             t0 = time.time()
         # Index is lost during overlay, and must be recreated
         geodf = self.to_dataframe(geo=True).to_crs(grid.crs)[['geometry']]
-        geodf['source_area'] = geodf['geometry'].area
+        geodf['source_area'] = shapely.area(np.asarray(geodf.geometry.values))
         # possible_matches_index = grid.sindex.intersection(geodf.total_bounds)
         # igrid = grid.iloc[possible_matches_index]
         if geodf.shape[0] == 0:
@@ -332,15 +788,43 @@ class satellite:
                 + f' ({time.time() - t0:.1f}s)'
             )
             t0 = time.time()
-        myidx = list(geodf.index.names) + list(grid.index.names)
         if verbose > 0:
             print('Making overlay', flush=True)
 
-        intx = gpd.overlay(
-            geodf.reset_index(), grid.reset_index(), how='intersection',
-            keep_geom_type=False, make_valid=True
+        # Equivalent to gpd.overlay(how='intersection', keep_geom_type=False,
+        # make_valid=True), but candidate pairs come from one bulk STRtree
+        # query and are intersected in one vectorized call.
+        pixgeoms = np.asarray(geodf.geometry.values)
+        pixinvalid = ~shapely.is_valid(pixgeoms)
+        if pixinvalid.any():
+            pixgeoms = pixgeoms.copy()
+            pixgeoms[pixinvalid] = shapely.make_valid(pixgeoms[pixinvalid])
+        if grid_tree is None:
+            grid_tree = _make_grid_tree(grid)
+        gridgeoms = grid_tree.geometries
+        # Bounding box candidates, then the intersects predicate evaluated
+        # with the (prepared) grid cell as the left-hand geometry.
+        pixidx, gridjdx = grid_tree.query(pixgeoms)
+        isintx = shapely.intersects(gridgeoms[gridjdx], pixgeoms[pixidx])
+        pixidx = pixidx[isintx]
+        gridjdx = gridjdx[isintx]
+        intxgeoms = shapely.intersection(pixgeoms[pixidx], gridgeoms[gridjdx])
+        notempty = ~shapely.is_empty(intxgeoms)
+        pixidx = pixidx[notempty]
+        gridjdx = gridjdx[notempty]
+        intxidx = pd.MultiIndex.from_frame(pd.concat([
+            geodf.index[pixidx].to_frame(index=False),
+            grid.index[gridjdx].to_frame(index=False),
+        ], axis=1))
+        intxattrs = pd.concat([
+            geodf.drop(columns=geodf.geometry.name).iloc[pixidx]
+            .reset_index(drop=True),
+            grid.drop(columns=grid.geometry.name).iloc[gridjdx]
+            .reset_index(drop=True),
+        ], axis=1).set_axis(intxidx, axis=0)
+        intx = gpd.GeoDataFrame(
+            intxattrs, geometry=intxgeoms[notempty], crs=grid.crs
         )
-        intx.set_index(myidx, inplace=True)
 
         if verbose > 1:
             print(
@@ -353,7 +837,12 @@ class satellite:
             print('Adding weights', flush=True)
 
         self.add_weights(intx, option=weighting)
-        justweight = intx[['weight']]
+        # Only weights are needed below; a plain DataFrame keeps shapely
+        # geometries out of the joins and lets them be freed now.
+        justweight = pd.DataFrame(
+            {'weight': intx['weight'].to_numpy()}, index=intx.index
+        )
+        del intx, geodf, pixgeoms, intxgeoms
         overlays = {}
 
         for dimset, keys in dimsets.items():
@@ -431,10 +920,11 @@ class satellite:
             if verbose > 1:
                 print(' - Adding attributes', flush=True)
             for key in gdf.columns:
-                if key in self.ds.variables:
-                    gdf[key].attrs.update(self.ds[key].attrs)
+                attrs = self._var_attrs(key)
+                if attrs is not None:
+                    gdf[key].attrs.update(attrs)
 
-            overlays[tuple(dimset)] = gdf
+            overlays[dimset] = gdf
 
         if as_dataset:
             import xarray as xr
@@ -443,12 +933,13 @@ class satellite:
             for dimks, outdf in overlays.items():
                 dss[dimks] = xr.Dataset.from_dataframe(outdf)
             outds = xr.merge(dss.values()).reindex(**{
-                griddim: grid.index.get_level_values(griddim).unique()
+                griddim: grid.index.unique(level=griddim)
                 for griddim in griddims
             })
             for key in outds.variables:
-                if key in self.ds.variables:
-                    outds[key].attrs.update(self.ds[key].attrs)
+                attrs = self._var_attrs(key)
+                if attrs is not None:
+                    outds[key].attrs.update(attrs)
             docstr = getattr(self, '__doc__', None)
             if docstr is None:
                 docstr = ""
@@ -497,65 +988,48 @@ class satellite:
         )
 
     @classmethod
-    def paths_to_level3(
-        cls, paths, grid, griddims=None, weighting='area', bbox=None,
-        verbose=0, varkeys=None, as_dataset=True, **kwargs
+    def _combine_level3(
+        cls, paths, grid, griddims, withdata, pathattrs, nodata, as_dataset
     ):
         """
-        Iteratively apply
-        output = cls(path).to_level3(*args, path=path, **kwds)
-        and then grouped_weighted_avg(output[dims]) for each dimset.
+        Combine per-path outputs of to_level3 (as_dataset=False) for
+        paths_to_level3 and paths_to_level3_mf.
 
-        For description of keywords, see to_level3.
+        Arguments
+        ---------
+        paths : list
+            Paths in output order
+        withdata : dict
+            to_level3 outputs by path
+        pathattrs : dict
+            Source variable attributes by path
+        nodata : dict
+            Error representation by path for paths without data
+
+        Returns
+        -------
+        outputs : dict or xr.Dataset
+            See paths_to_level3
         """
-        import pandas as pd
         from copy import copy
 
-        if varkeys is None:
-            varkeys = ()
-
-        withdata = {}
-        nodata = {}
-        if griddims is None:
-            griddims = list(grid.index.names)
-
-        for path in paths:
-            if verbose > 0:
-                print(path)
-            try:
-                sat = cls.open_dataset(path, bbox=bbox, **kwargs)
-                withdata[path] = sat.to_level3(
-                    *varkeys, grid=grid, griddims=griddims,
-                    weighting=weighting, verbose=verbose, as_dataset=False
-                )
-            except Exception as e:
-                nodata[path] = repr(e)
-                if verbose > 0:
-                    print(nodata[path])
-
-        keys = sorted(withdata)
+        # Attributes come from the first path (in paths order) with data
+        varattrs = next(iter(
+            pathattrs[path] for path in paths if path in pathattrs
+        ), {})
         dimdatasets = {}
-        dimpaths = {}
         for path, output in withdata.items():
             for key, valdf in output.items():
                 dimdatasets.setdefault(key, []).append(valdf)
-                dimpaths.setdefault(key, []).append(path)
         outputs = {}
         for dimks, dimdfs in dimdatasets.items():
-            keys = dimpaths[dimks]
             attrs = {
                 key: copy(dimdfs[0][key].attrs) for key in dimdfs[0].columns
             }
-            combinedf = pd.concat(
-                dimdfs, keys=keys, names=['path']
-            )
-            outdims = list(dimdfs[0].index.names)
-            if 'weight_sum' not in combinedf.columns:
-                combinedf = combinedf.groupby(outdims).mean()
+            if 'weight_sum' not in dimdfs[0].columns:
+                combinedf = _accumulated_avg(dimdfs)
             else:
-                combinedf = grouped_weighted_avg(
-                    combinedf, combinedf['weight_sum'], outdims
-                )
+                combinedf = _accumulated_avg(dimdfs, 'weight_sum')
 
             for key in combinedf.columns:
                 if key in attrs:
@@ -570,12 +1044,12 @@ class satellite:
                 dss[dimks] = xr.Dataset.from_dataframe(outdf)
 
             outds = xr.merge(dss.values()).reindex(**{
-                griddim: grid.index.get_level_values(griddim).unique()
+                griddim: grid.index.unique(level=griddim)
                 for griddim in griddims
             })
             for key in outds.variables:
-                if key in sat.ds.variables:
-                    outds[key].attrs.update(sat.ds[key].attrs)
+                if key in varattrs:
+                    outds[key].attrs.update(varattrs[key])
             docstr = getattr(cls, '__doc__', None)
             if docstr is None:
                 docstr = ""
@@ -590,3 +1064,195 @@ class satellite:
             return outds
 
         return outputs, nodata
+
+    @classmethod
+    def paths_to_level3(
+        cls, paths, grid, griddims=None, weighting='area', bbox=None,
+        verbose=0, varkeys=None, as_dataset=True, nworkers=1, **kwargs
+    ):
+        """
+        Iteratively apply
+        output = cls(path).to_level3(*args, path=path, **kwds)
+        and then grouped_weighted_avg(output[dims]) for each dimset.
+
+        For description of keywords, see to_level3.
+
+        Arguments
+        ---------
+        nworkers : int
+            If greater than 1, paths are processed concurrently by a pool of
+            nworkers processes. The grid is sent to each worker once. Workers
+            are spawned rather than forked, because a forked copy of a
+            dask thread pool that was used in this process deadlocks.
+            Spawning has two requirements:
+              - a script that calls this must guard its entry point with
+                `if __name__ == '__main__':`; otherwise each worker re-runs
+                the script on import and multiprocessing raises a
+                RuntimeError.
+              - cls must be importable by the workers. Reader subclasses
+                defined in a notebook or an interactive __main__ cannot be
+                unpickled there; define them in a module instead.
+        """
+        if varkeys is None:
+            varkeys = ()
+
+        withdata = {}
+        nodata = {}
+        pathattrs = {}
+        if griddims is None:
+            griddims = list(grid.index.names)
+
+        l3kwargs = dict(griddims=griddims, weighting=weighting, verbose=verbose)
+        if nworkers > 1:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor, as_completed
+            with ProcessPoolExecutor(
+                max_workers=nworkers, initializer=_init_worker,
+                initargs=(grid,),
+                mp_context=multiprocessing.get_context('spawn')
+            ) as ex:
+                futures = {
+                    ex.submit(
+                        _process_one, cls, path, None, bbox, varkeys,
+                        l3kwargs, kwargs
+                    ): path
+                    for path in paths
+                }
+                for future in as_completed(futures):
+                    path = futures[future]
+                    if verbose > 0:
+                        print(path)
+                    try:
+                        withdata[path], pathattrs[path] = future.result()
+                    except Exception as e:
+                        nodata[path] = repr(e)
+                        if verbose > 0:
+                            print(nodata[path])
+            # Keep outputs in path order regardless of completion order
+            withdata = {
+                path: withdata[path] for path in paths if path in withdata
+            }
+        else:
+            # The grid is constant, so its index is only built once
+            grid_tree = _make_grid_tree(grid)
+            for path in paths:
+                if verbose > 0:
+                    print(path)
+                try:
+                    withdata[path], pathattrs[path] = _process_one(
+                        cls, path, grid, bbox, varkeys, l3kwargs, kwargs,
+                        grid_tree=grid_tree
+                    )
+                except Exception as e:
+                    nodata[path] = repr(e)
+                    if verbose > 0:
+                        print(nodata[path])
+
+        return cls._combine_level3(
+            paths, grid, griddims, withdata, pathattrs, nodata, as_dataset
+        )
+
+    @classmethod
+    def paths_to_level3_mf(
+        cls, paths, grid, griddims=None, weighting='area', bbox=None,
+        verbose=0, varkeys=None, as_dataset=True, **kwargs
+    ):
+        """
+        Similar to paths_to_level3, but all paths are opened first and
+        combined along a new granule dimension so that to_level3 (geometry,
+        overlay and weighting) runs once for all files. Granules are padded
+        to the largest size with invalid pixels. Each granule is averaged
+        per grid cell before granules are combined, so the output is the
+        same as paths_to_level3. If the files do not share variables and
+        dimensions, to_level3 is applied to each opened file instead.
+
+        For description of keywords, see to_level3.
+        """
+        import xarray as xr
+
+        if varkeys is None:
+            varkeys = ()
+        if griddims is None:
+            griddims = list(grid.index.names)
+
+        paths = list(paths)
+        sats = {}
+        nodata = {}
+        for path in paths:
+            if verbose > 0:
+                print(path)
+            try:
+                sats[path] = cls.open_dataset(path, bbox=bbox, **kwargs)
+            except Exception as e:
+                nodata[path] = repr(e)
+                if verbose > 0:
+                    print(nodata[path])
+
+        if len(sats) == 0:
+            raise ValueError(f'No paths could be opened: {nodata}')
+
+        dss = [sat.ds for sat in sats.values()]
+        schemas = set(
+            tuple((k, v.dims) for k, v in ds.variables.items()) for ds in dss
+        )
+        sizes = {}
+        for ds in dss:
+            for dim, size in ds.sizes.items():
+                sizes[dim] = max(size, sizes.get(dim, 0))
+        pads = [
+            {
+                dim: (0, sizes[dim] - size) for dim, size in ds.sizes.items()
+                if size < sizes[dim]
+            }
+            for ds in dss
+        ]
+        pathattrs = {
+            path: {k: dict(v.attrs) for k, v in sat.ds.variables.items()}
+            for path, sat in sats.items()
+        }
+        l3kwargs = dict(griddims=griddims, weighting=weighting, verbose=verbose)
+        withdata = {}
+        if len(schemas) != 1 or any(
+            dim in ds.indexes for ds, pad in zip(dss, pads) for dim in pad
+        ):
+            if verbose > 0:
+                print('Schemas differ; applying to_level3 to each file')
+            grid_tree = _make_grid_tree(grid)
+            for path, sat in sats.items():
+                try:
+                    withdata[path] = sat.to_level3(
+                        *varkeys, grid=grid, grid_tree=grid_tree,
+                        as_dataset=False, **l3kwargs
+                    )
+                except Exception as e:
+                    nodata[path] = repr(e)
+                    if verbose > 0:
+                        print(nodata[path])
+        else:
+            sat = cls()
+            sat.path = list(sats)
+            sat.bbox = bbox
+            sat.ds = xr.concat(
+                [_pad_dataset(ds, pad) for ds, pad in zip(dss, pads)],
+                dim='granule'
+            )
+            l3kwargs['griddims'] = ['granule'] + list(griddims)
+            overlays = sat.to_level3(
+                *varkeys, grid=grid, as_dataset=False, **l3kwargs
+            )
+            # Split per-granule cell averages back out by path so they are
+            # combined exactly as in paths_to_level3.
+            for dimks, gdf in overlays.items():
+                outks = tuple(dk for dk in dimks if dk != 'granule')
+                for gi, gidf in gdf.groupby(level='granule', sort=True):
+                    path = sat.path[gi]
+                    withdata.setdefault(path, {})[outks] = gidf.droplevel(
+                        'granule'
+                    )
+            for path in sats:
+                if path not in withdata:
+                    nodata[path] = repr(ValueError('No valid pixels'))
+
+        return cls._combine_level3(
+            paths, grid, griddims, withdata, pathattrs, nodata, as_dataset
+        )
@@ -1,6 +1,6 @@
 __all__ = ['IASI_NH3']
 
-from ..core import satellite
+from ..core import satellite, _any_positions
 from ...utils import EasyDataFramePoint
 
 
@@ -44,17 +44,13 @@ class IASI_NH3(satellite):
         ds.coords['time'] = np.arange(ds.dims['time'])
         if bbox is not None:
             swlon, swlat, nelon, nelat = bbox
-            df = ds[['latitude', 'longitude']].to_dataframe()
-            df = df.query(
-                f'longitude >= {swlon} and longitude <= {nelon}'
-                + f' and latitude >= {swlat} and latitude <= {nelat}'
-            )
-            times = df.index.get_level_values('time').values
-            ds = ds.sel(time=times)
-            ds['valid'] = ds['valid'] & (
+            inbbox = (
                 (ds['latitude'] >= swlat) & (ds['latitude'] <= nelat)
                 & (ds['longitude'] >= swlon) & (ds['longitude'] <= nelon)
             )
+            times = _any_positions(inbbox.values, inbbox.dims)['time']
+            ds = ds.isel(time=times)
+            ds['valid'] = ds['valid'] & inbbox.isel(time=times)
 
         if not ds['valid'].any():
             import warnings
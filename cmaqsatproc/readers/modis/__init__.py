@@ -1,6 +1,6 @@
 __all__ = ['MODISL3', 'MOD04', 'MOD04_3K', 'MOD04_L2', 'modis_readers']
 
-from ..core import satellite
+from ..core import satellite, _any_positions
 from ...utils import EasyDataFramePoint, grouped_weighted_avg
 from . import modis_readers
 
@@ -60,12 +60,12 @@ class MOD04(satellite):
         ds = xr.open_dataset(path, **kwargs)
         if bbox is not None:
             swlon, swlat, nelon, nelat = bbox
-            df = ds[['Longitude', 'Latitude']].to_dataframe()
-            df = df.query(
-                f'Longitude >= {swlon} and Longitude <= {nelon}'
-                + f' and Latitude >= {swlat} and Latitude <= {nelat}'
+            inbbox = (
+                (ds['Latitude'] >= swlat) & (ds['Latitude'] <= nelat)
+                & (ds['Longitude'] >= swlon) & (ds['Longitude'] <= nelon)
             )
-            cas = df.index.get_level_values('Cell_Along_Swath').values
+            lines = _any_positions(inbbox.values, inbbox.dims)
+            cas = ds['Cell_Along_Swath'].values[lines['Cell_Along_Swath']]
             ds = ds.sel(Cell_Along_Swath=slice(cas.min(), cas.max() + 1))
 
         Cell_Along_Swath_Edges = np.concatenate(
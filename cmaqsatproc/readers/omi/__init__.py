@@ -1,7 +1,306 @@
 __all__ = ['OMIL2', 'OMNO2', 'OMHCHO', 'OMPROFOZ', 'OMO3PR']
 
-from ..core import satellite
-from ...utils import walk_groups
+import functools
+import re
+
+from ..core import satellite, _pop_decode_kwargs
+from ...utils import walk_groups, _cell_edges
+
+# Never let a dimension be named +1 or p1 (e.g., nTimes+1 or nTimesp1);
+# use _1 to be consistent with nTimes_1
+_p1re = re.compile(r'\+1|p1')
+
+
+def _parse_dimlists(struct):
+    """
+    Get dimensions of each field from HDF-EOS StructMetadata text. Lines are
+    scanned once; only FieldName and DimList lines within OBJECT/END_OBJECT
+    blocks are kept. For example:
+
+        OBJECT=DataField_1
+            DataFieldName="O3TotalColumn"
+            DimList=("nTimes","nXtrack")
+        END_OBJECT=DataField_1
+
+    Arguments
+    ---------
+    struct : str
+        Contents of StructMetadata.0
+
+    Returns
+    -------
+    dimassignments : dict
+        Tuple of dimension names by field name
+    """
+    import ast
+
+    dimassignments = {}
+    current = None
+    for line in struct.splitlines():
+        line = line.strip()
+        if line.startswith('END_OBJECT'):
+            if current is None:
+                continue
+            fieldkeys = [k for k in current if k.endswith('FieldName')]
+            hasfield = any('FieldName' in k for k in current)
+            if 'DimList' in current and hasfield:
+                if len(fieldkeys) == 0:
+                    raise KeyError(f'No field name in {sorted(current)}')
+                dimv = current['DimList']
+                if isinstance(dimv, str):
+                    if dimv.isnumeric():
+                        dimv = 'n' + dimv
+                    dimv = (dimv,)
+                dimassignments[current[fieldkeys[0]]] = dimv
+            current = None
+        elif line.startswith('OBJECT='):
+            current = {}
+        elif current is not None and (
+            'DimList=' in line or 'FieldName' in line
+        ):
+            key, val = _p1re.sub('_1', line).split('=', 1)
+            current[key] = ast.literal_eval(val)
+    return dimassignments
+
+
+_swath_groups = ('Data Fields', 'Geolocation Fields')
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_struct_metadata(path, mtime):
+    """
+    Read and parse HDF-EOS metadata of an OMI file. Results are cached, so
+    reopening a file does not reread StructMetadata.0.
+
+    Arguments
+    ---------
+    path : str
+        Path to a OMI he5-style file
+    mtime : float or None
+        Modification time of path; part of the cache key so that changed
+        files are reparsed. None for remote paths.
+
+    Returns
+    -------
+    dimassignments, datakey, geokey : dict, str, str
+        Dimensions by field name (see _parse_dimlists) and the group paths
+        of the Data Fields and Geolocation Fields.
+    """
+    import netCDF4
+
+    with netCDF4.Dataset(path) as tmpf:
+        struct = tmpf['HDFEOS INFORMATION/StructMetadata.0'][:]
+        dimassignments = _parse_dimlists(struct)
+        # OMI swaths are /HDFEOS/SWATHS/<swath>/{Data,Geolocation} Fields
+        try:
+            swaths = tmpf['HDFEOS/SWATHS'].groups
+        except (KeyError, IndexError):
+            swaths = {}
+        if len(swaths) == 1:
+            (swath, swathgrp), = swaths.items()
+            if set(swathgrp.groups).issuperset(_swath_groups):
+                prefix = f'/HDFEOS/SWATHS/{swath}/'
+                return (dimassignments,) + tuple(
+                    prefix + gk for gk in _swath_groups
+                )
+        groupkeys = walk_groups(tmpf, '')
+    datakey, = [gk for gk in groupkeys if gk.endswith('Data Fields')]
+    geokey, = [gk for gk in groupkeys if gk.endswith('Geolocation Fields')]
+    return dimassignments, datakey, geokey
+
+
+def _all_valid(*conds):
+    """
+    Combine boolean conditions with numpy.logical_and over the raw arrays
+    instead of chaining xarray & operations. Arrays that are dask arrays
+    stay lazy.
+
+    Arguments
+    ---------
+    conds : xarray.DataArray
+        Boolean conditions with the same dimensions (in any order)
+
+    Returns
+    -------
+    valid : xarray.DataArray
+        True where all conds are True; dimensions ordered like conds[0]
+    """
+    import numpy as np
+    import xarray as xr
+
+    dims = conds[0].dims
+    valid = functools.reduce(
+        np.logical_and, [cond.transpose(*dims).data for cond in conds]
+    )
+    return xr.DataArray(valid, dims=dims)
+
+
+def _bbox_conds(ds, bbox):
+    """
+    Latitude/Longitude conditions for pixels in bbox or [] if bbox is None.
+    Uses the inbbox mask stored by OMIL2.prep_dataset when available.
+    """
+    if bbox is None:
+        return []
+    if 'inbbox' in ds.variables:
+        return [ds['inbbox']]
+    swlon, swlat, nelon, nelat = bbox
+    lat = ds['Latitude']
+    lon = ds['Longitude']
+    return [lat >= swlat, lat <= nelat, lon >= swlon, lon <= nelon]
+
+
+# Long name parts and their abbreviations for OMIL2.shorten_name. Longer
+# parts are listed first so they match before parts they contain.
+_shortnames = {
+    'ReferenceSectorCorrectedVerticalColumn': 'RefSctCor_VCD',
+    'TerrainReflectivity': 'TerrainRefl',
+    'SlantColumnAmount': 'SCD',
+    'ClimatologyLevels': 'ClimPresLevels',
+    'Configuration': 'Cfg',
+    'Registration': 'Reg',
+    'QualityFlags': 'QAFlag',
+    'ColumnAmount': 'VCD',
+    'Measurement': 'Msrmt',
+    'Scattering': 'Scat',
+    'Spacecraft': 'Craft',
+    'Wavelength': 'WvLen',
+    'Longitude': 'Lon',
+    'Radiance': 'Rad',
+    'Pressure': 'Press',
+    'Altitude': 'Alt',
+    'Latitude': 'Lat',
+    'Fraction': 'Frac',
+    'Viewing': 'View',
+    'Pointer': 'Ptr',
+    'Angle': 'Ang',
+    'Pixel': 'Pix',
+    'Check': 'Chk',
+}
+_shortre = re.compile('|'.join(re.escape(k) for k in _shortnames))
+
+
+# molecules/mole * m**2/cm**2; converts mole/m**2 to molecules/cm**2
+_N_PER_CM2 = 6.022e23 / 1e4
+_vmr_scales = {'ppm': 1e-6, 'ppb': 1e-9, 'ppt': 1e-12}
+
+
+def _vmr_scale(var):
+    """
+    Arguments
+    ---------
+    var : xr.DataArray
+        Mixing ratio variable with units starting with ppm, ppb, or ppt
+
+    Returns
+    -------
+    scale : float
+        Factor that converts var to a mole fraction
+    """
+    units = var.units.strip()
+    scale = _vmr_scales.get(units[:3])
+    if scale is None:
+        raise ValueError(f'Unknown mixing ratio units: {units!r}')
+    return scale
+
+
+# Pixel corners as (nTimes_1, nXtrack_1) slices of edge arrays
+_edge_corners = {
+    'll': (slice(None, -1), slice(None, -1)),
+    'ul': (slice(None, -1), slice(1, None)),
+    'lu': (slice(1, None), slice(None, -1)),
+    'uu': (slice(1, None), slice(1, None)),
+}
+
+
+def _add_corners_from_edges(ds, xedges, yedges):
+    """
+    Add ll_x, ll_y, ... uu_x, uu_y to ds from pixel edge arrays. Corners are
+    lazy slices of the edge arrays, so nothing is read until used.
+
+    Arguments
+    ---------
+    ds : xarray.Dataset
+        Dataset with nTimes and nXtrack dimensions
+    xedges, yedges : xarray.DataArray
+        Longitude and latitude with nTimes_1 and nXtrack_1 dimensions
+
+    Returns
+    -------
+    None
+    """
+    renames = {'nTimes_1': 'nTimes', 'nXtrack_1': 'nXtrack'}
+    # Edge coordinates do not apply to pixels, so drop them
+    x = xedges.drop_vars(list(xedges.coords)).transpose(*renames)
+    y = yedges.drop_vars(list(yedges.coords)).transpose(*renames)
+    for key, (tslice, xslice) in _edge_corners.items():
+        isel = dict(nTimes_1=tslice, nXtrack_1=xslice)
+        ds[f'{key}_x'] = x.isel(**isel).rename(renames)
+        ds[f'{key}_y'] = y.isel(**isel).rename(renames)
+
+
+def _amf_kernel(sw, var):
+    """
+    Partial column weighted mean of scattering weights over the last axis.
+    Layers where either input is missing are skipped; columns with no
+    weight are NaN.
+    """
+    import numpy as np
+
+    m = ~(np.isnan(sw) | np.isnan(var))
+    num = np.where(m, sw * var, 0).sum(axis=-1)
+    den = np.where(m, var, 0).sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(den != 0, num / den, np.nan)
+
+
+def _cmaq_amf(q_sw, q_var):
+    """
+    Arguments
+    ---------
+    q_sw : xarray.DataArray
+        Scattering weights on the CMAQ grid with a LAY dimension
+    q_var : xarray.DataArray
+        Partial column density on the CMAQ grid with a LAY dimension
+
+    Returns
+    -------
+    cmaqamf : xarray.DataArray
+        Air Mass Factor; sum(q_sw * q_var) / sum(q_var) over LAY
+    """
+    import xarray as xr
+
+    return xr.apply_ufunc(
+        _amf_kernel, q_sw, q_var,
+        input_core_dims=[['LAY'], ['LAY']], output_core_dims=[[]],
+        join='inner', dask='parallelized', output_dtypes=[float],
+    )
+
+
+def _flag_clear(flag, bits=1):
+    """
+    Arguments
+    ---------
+    flag : xarray.DataArray
+        Bit flag variable. Integer flags are tested in their native dtype.
+        Flags decoded to float (because of a _FillValue) are cast back to
+        their on-disk integer dtype with missing flags treated as unset.
+    bits : int
+        Bit mask to test
+
+    Returns
+    -------
+    clear : xarray.DataArray
+        True where none of bits are set
+    """
+    import numpy as np
+
+    if flag.dtype.kind not in 'iu':
+        dtype = np.dtype(flag.encoding.get('dtype', 'i8'))
+        if dtype.kind not in 'iu':
+            dtype = np.dtype('i8')
+        flag = flag.fillna(0).astype(dtype)
+    return (flag & bits) == 0
 
 
 def cloudleq(cldf, thresh):
@@ -51,76 +350,39 @@ class OMIL2(satellite):
             Satellite processing instance
         """
 
-        import netCDF4
+        import os
         import xarray as xr
-        import re
-        tmpf = netCDF4.Dataset(path)
-        struct = tmpf['HDFEOS INFORMATION/StructMetadata.0'][:]
-        dimassignments = {}
-        # DataFieldName="O3TotalColumn"
-        # DimList=("nTimes","nXtrack")
-
-        ore = re.compile('OBJECT=.*?END_OBJECT', re.MULTILINE | re.S)
-        for i in ore.findall(struct):
-            # Get FieldName and DimList
-            # Never let a dimension be named +1 or _1
-            # (e.g., nTimes+1, nTimes_1, or nTimesp1)
-            # use _1 to be consistent
-            namedim = '\n,'.join([
-                l.strip().replace('+1', '_1').replace('p1', '_1')
-                for l in i.split('\n')
-                if 'DimList=' in l or 'FieldName' in l
-            ])
-            if 'DimList' in namedim and 'FieldName' in namedim:
-                namedimd = eval('dict(' + namedim + ')')
-                for fn in namedimd:
-                    if fn.endswith('FieldName'):
-                        break
-                else:
-                    raise KeyError(f'No field name in {sorted(namedimd)}')
-                dimv = namedimd['DimList']
-                if isinstance(dimv, str):
-                    if dimv.isnumeric():
-                        dimv = 'n' + dimv
-                    dimv = (dimv,)
-                dimassignments[namedimd[fn]] = dimv
 
-        uniqdims = set()
-        for vark, dimset in dimassignments.items():
-            uniqdims = uniqdims.union(dimset)
+        try:
+            mtime = os.stat(path).st_mtime
+        except (OSError, ValueError):
+            mtime = None
+        dimassignments, datakey, geokey = _parse_struct_metadata(path, mtime)
 
-        datakey, = [
-            gk for gk in walk_groups(tmpf, '') if gk.endswith('Data Fields')
-        ]
-        geokey, = [
-            gk for gk in walk_groups(tmpf, '')
-            if gk.endswith('Geolocation Fields')
-        ]
-        del tmpf
-        datads = xr.open_dataset(path, group=datakey, **kwargs)
-        geods = xr.open_dataset(path, group=geokey, **kwargs)
+        # CF decoding is deferred until after the bbox subset so that only
+        # retained pixels are masked, scaled, and converted.
+        decode_cf, decodekw = _pop_decode_kwargs(kwargs)
+        datads = xr.open_dataset(path, group=datakey, decode_cf=False, **kwargs)
+        geods = xr.open_dataset(path, group=geokey, decode_cf=False, **kwargs)
 
+        # Map phony dimensions (e.g., phony_dim_0) to StructMetadata names
         redatadims = {}
         regeodims = {}
-        for dimk in uniqdims:
-            for vark, dimset in dimassignments.items():
-                if vark in datads and dimk in dimset:
-                    tmpvar = datads[vark]
-                    for di, dk in enumerate(dimset):
-                        if dimk == dk:
-                            phonydk = tmpvar.dims[di]
-                            redatadims[phonydk] = dimk
-
-            for vark, dimset in dimassignments.items():
-                if vark in geods and dimk in dimset:
-                    tmpvar = geods[vark]
-                    for di, dk in enumerate(dimset):
-                        if dimk == dk:
-                            phonydk = tmpvar.dims[di]
-                            regeodims[phonydk] = dimk
+        for vark, dimset in dimassignments.items():
+            for srcds, redims in [(datads, redatadims), (geods, regeodims)]:
+                if vark in srcds.variables:
+                    phonydims = srcds.variables[vark].dims
+                    for phonydk, dk in zip(phonydims, dimset):
+                        redims.setdefault(phonydk, dk)
 
         ds = xr.merge([datads.rename(**redatadims), geods.rename(**regeodims)])
+        if decode_cf:
+            # bbox needs decoded coordinates
+            geokeys = [k for k in ('Latitude', 'Longitude') if k in ds]
+            ds.update(xr.decode_cf(ds[geokeys], **decodekw))
         ds = cls.prep_dataset(ds, bbox=bbox, path=path)
+        if decode_cf:
+            ds = xr.decode_cf(ds, **decodekw)
         sat = cls()
         sat.path = path
         sat.ds = ds
@@ -130,7 +392,11 @@ class OMIL2(satellite):
     @classmethod
     def prep_dataset(cls, ds, bbox=None, path=None):
         """
-        Applies spatial subset based on Latitude and Longitude
+        Applies spatial subset based on Latitude and Longitude. The dataset
+        is cropped to the scan lines with pixels in bbox, and the pixel mask
+        is stored as inbbox for use in valid. nXtrack is not cropped so that
+        cross-track positions are the same in every granule and edges of the
+        outer pixels are not clamped.
 
         Arguments
         ---------
@@ -146,20 +412,24 @@ class OMIL2(satellite):
         ds : xarray.Dataset
         """
         if bbox is not None:
+            import numpy as np
             swlon, swlat, nelon, nelat = bbox
-            df = ds[['Latitude', 'Longitude']].to_dataframe()
-            df = df.query(
-                f'Latitude >= {swlat} and Latitude <= {nelat}'
-                + f' and Longitude >= {swlon} and Longitude <= {nelon}'
+            lat = ds['Latitude'].transpose('nTimes', 'nXtrack').values
+            lon = ds['Longitude'].transpose('nTimes', 'nXtrack').values
+            inbbox = (
+                (lat >= swlat) & (lat <= nelat)
+                & (lon >= swlon) & (lon <= nelon)
             )
-            times = df.index.get_level_values('nTimes').unique()
-            if len(times) < 0:
+            times = np.flatnonzero(inbbox.any(axis=1))
+            if times.size == 0:
                 raise ValueError(f'{path} has no values in {bbox}')
-            ds = ds.isel(
-                nTimes=slice(times.min(), times.max() + 1)
-            )
+            tslice = slice(times.min(), times.max() + 1)
+            isel = dict(nTimes=tslice)
+            # edge dimensions have one more element
             if 'nTimes_1' in ds.dims:
-                ds = ds.isel(nTimes_1=slice(times.min(), times.max() + 2))
+                isel['nTimes_1'] = slice(tslice.start, tslice.stop + 1)
+            ds = ds.isel(**isel)
+            ds['inbbox'] = ('nTimes', 'nXtrack'), inbbox[tslice]
         return ds
 
     @classmethod
@@ -191,6 +461,84 @@ class OMIL2(satellite):
         sat.bbox = bbox
         return sat
 
+    @classmethod
+    def open_mfdataset(cls, paths, bbox=None, **kwargs):
+        """
+        Open many granules with open_dataset and concatenate them along
+        nTimes. Granules are opened one at a time because netCDF4/HDF5
+        reads are not thread safe in default builds. Edge variables
+        (nTimes_1) are dropped because pixel corners have already been
+        derived from them. Other dimensions are aligned by index when they
+        have one and padded otherwise; added pixels are invalid. Granules
+        without valid pixels in bbox (ValueError) are skipped and recorded
+        in the history attribute, as in paths_to_level3; any other error
+        is raised.
+
+        Arguments
+        ---------
+        paths : iterable
+            Paths to OMI OpenDAP-style or he5-style files
+        bbox : iterable
+            swlon, swlat, nelon, nelat in decimal degrees East and North
+        kwargs : mappable
+            Passed to open_dataset
+
+        Returns
+        -------
+        sat: OMIL2
+            Satellite processing instance
+        """
+        import xarray as xr
+        from ..core import _pad_dataset
+
+        okpaths = []
+        sats = []
+        nodata = {}
+        for path in paths:
+            try:
+                sat = cls.open_dataset(path, bbox=bbox, **kwargs)
+            except ValueError as e:
+                nodata[path] = repr(e)
+                continue
+            okpaths.append(path)
+            sats.append(sat)
+        if len(sats) == 0:
+            raise ValueError(f'No paths could be opened: {nodata}')
+
+        dss = []
+        for sat in sats:
+            ds = sat.ds
+            edgekeys = [
+                k for k, v in ds.variables.items() if 'nTimes_1' in v.dims
+            ]
+            dss.append(ds.drop_vars(edgekeys))
+        # Unindexed dimensions are padded; indexed ones are outer joined
+        sizes = {}
+        for ds in dss:
+            for dim, size in ds.sizes.items():
+                if dim != 'nTimes' and dim not in ds.indexes:
+                    sizes[dim] = max(size, sizes.get(dim, 0))
+        dss = [
+            _pad_dataset(ds, {
+                dim: (0, sizes[dim] - size) for dim, size in ds.sizes.items()
+                if dim in sizes and size < sizes[dim]
+            })
+            for ds in dss
+        ]
+        fill_value = {
+            k: False for k, v in dss[0].data_vars.items() if v.dtype == bool
+        }
+        ds = xr.concat(
+            dss, dim='nTimes', data_vars='minimal', coords='minimal',
+            compat='override', join='outer', fill_value=fill_value
+        )
+        ds.attrs['history'] = str(nodata)
+        sat = cls()
+        sat.path = okpaths
+        sat.ds = ds
+        sat.bbox = bbox
+        return sat
+
     @classmethod
     def shorten_name(cls, key):
         """
@@ -207,33 +555,7 @@ class OMIL2(satellite):
         shortkey : str
             Shortened key
         """
-        key = key.replace(
-            'ReferenceSectorCorrectedVerticalColumn', 'RefSctCor_VCD'
-        )
-        key = key.replace('SlantColumnAmount', 'SCD')
-        key = key.replace('ColumnAmount', 'VCD')
-        key = key.replace('Pressure', 'Press')
-        key = key.replace('Scattering', 'Scat')
-        key = key.replace('Altitude', 'Alt')
-        key = key.replace('Spacecraft', 'Craft')
-        key = key.replace('Wavelength', 'WvLen')
-        key = key.replace('Registration', 'Reg')
-        key = key.replace('Viewing', 'View')
-        key = key.replace('Angle', 'Ang')
-        key = key.replace('Pixel', 'Pix')
-        key = key.replace('Measurement', 'Msrmt')
-        key = key.replace('Radiance', 'Rad')
-        key = key.replace('Latitude', 'Lat')
-        key = key.replace('Longitude', 'Lon')
-        key = key.replace('Check', 'Chk')
-        key = key.replace('Fraction', 'Frac')
-        key = key.replace('Configuration', 'Cfg')
-        key = key.replace('Pointer', 'Ptr')
-        key = key.replace('CloudRadianceFraction', 'CldRadFrac')
-        key = key.replace('QualityFlags', 'QAFlag')
-        key = key.replace('TerrainReflectivity', 'TerrainRefl')
-        key = key.replace('ClimatologyLevels', 'ClimPresLevels')
-        return key
+        return _shortre.sub(lambda m: _shortnames[m.group(0)], key)
 
 
 class OMNO2(OMIL2):
@@ -246,9 +568,8 @@ class OMNO2(OMIL2):
       * CloudFraction <= 0.3
     """
     _defaultkeys = (
-        'ColumnAmountNO2Trop', 'AmfTrop', 'ColumnAmountNO2Trop', 'AmfTrop',
-        'ScatteringWeight', 'ScatteringWtPressure', 'TropopausePressure',
-        'TerrainPressure',
+        'ColumnAmountNO2Trop', 'AmfTrop', 'ScatteringWeight',
+        'ScatteringWtPressure', 'TropopausePressure', 'TerrainPressure',
     )
 
     @classmethod
@@ -300,18 +621,12 @@ class OMNO2(OMIL2):
             ds[f'{key}_x'] = ds['FoV75CornerLongitude'].sel(nCorners=corner)
             ds[f'{key}_y'] = ds['FoV75CornerLatitude'].sel(nCorners=corner)
 
-        ds['valid'] = (
-            ((ds['VcdQualityFlags'].astype('i') & 1) == 0)
-            & (ds['XTrackQualityFlags'] == 0)
-            & cloudleq(ds['CloudFraction'], 0.3)
+        ds['valid'] = _all_valid(
+            _flag_clear(ds['VcdQualityFlags']),
+            ds['XTrackQualityFlags'] == 0,
+            cloudleq(ds['CloudFraction'], 0.3),
+            *_bbox_conds(ds, bbox)
         )
-        if bbox is not None:
-            swlon, swlat, nelon, nelat = bbox
-            ds['valid'] = (
-                ds['valid']
-                & (ds['Latitude'] >= swlat) & (ds['Latitude'] <= nelat)
-                & (ds['Longitude'] >= swlon) & (ds['Longitude'] <= nelon)
-            )
 
         if not ds['valid'].any():
             import warnings
@@ -346,7 +661,7 @@ class OMNO2(OMIL2):
         """
         from ...utils import coord_interp
         qpres_hpa = overf['PRES'] / 100
-        sat_press = satl3f['ScatteringWtPressure'].copy()
+        sat_press = satl3f['ScatteringWtPressure']
         # No need to overwrite surface pressure
         # numpy.interp automatically extends the lowest level
         # sat_press.isel(nPresLevels=0)[:] = qpres_hpa.isel(LAY=0)
@@ -360,7 +675,7 @@ class OMNO2(OMIL2):
         return q_sw
 
     @classmethod
-    def cmaq_amf(cls, overf, satl3f, key='NO2_PER_CM2'):
+    def cmaq_amf(cls, overf, satl3f, key='NO2_PER_CM2', q_sw=None):
         """
         Calculate an alternative Air Mass Factor (AMF) using satellite
         scattering weights and the CMAQ vertical profile as a partial column
@@ -378,20 +693,20 @@ class OMNO2(OMIL2):
         key : str
             Key of the partial column density variable from CMAQ, which must
             have a LAY dimension that describes teh vertical coordinate.
+        q_sw : xr.DataArray
+            Optional, output of cmaq_sw if already available.
 
         Returns
         -------
         cmaqamf : xr.DataArray
             Air Mass Factor on the CMAQ grid
         """
-        q_sw = cls.cmaq_sw(overf, satl3f)
-        q_var = overf[key].where(~q_sw.isnull())
-        denom = q_var.sum('LAY')
-        cmaqamf = (q_sw * q_var).sum('LAY') / denom
-        return cmaqamf.where(denom != 0)
+        if q_sw is None:
+            q_sw = cls.cmaq_sw(overf, satl3f)
+        return _cmaq_amf(q_sw, overf[key])
 
     @classmethod
-    def cmaq_ak(cls, overf, satl3f):
+    def cmaq_ak(cls, overf, satl3f, q_sw=None):
         """
         Calculate an averaging kernel (AK) that would process CMAQ as though
         it were observed by the satellite. In this case, the averaging kernel
@@ -406,13 +721,16 @@ class OMNO2(OMIL2):
         satl3f : xarray.Dataset
             Output from to_level3, paths_to_level3, or cmr_to_level3 with
             as_dataset=True (the default).
+        q_sw : xr.DataArray
+            Optional, output of cmaq_sw if already available.
 
         Returns
         -------
         q_ak : xr.DataArray
             Averaging kernel on the CMAQ grid
         """
-        q_sw = cls.cmaq_sw(overf, satl3f)
+        if q_sw is None:
+            q_sw = cls.cmaq_sw(overf, satl3f)
         q_ak = q_sw / satl3f['AmfTrop']
         return q_ak
 
@@ -441,24 +759,21 @@ class OMNO2(OMIL2):
         overf = qf.csp.mean_overpass(satellite='aura')
         n_per_m2 = overf.csp.mole_per_m2(add=True)
         tgtvar = overf[key]
-        if tgtvar.units.strip().startswith('ppm'):
-            vmr = tgtvar / 1e6
-        elif tgtvar.units.strip().startswith('ppb'):
-            vmr = tgtvar / 1e9
-        elif tgtvar.units.strip().startswith('ppt'):
-            vmr = tgtvar / 1e12
-
-        overf['NO2_PER_CM2'] = n_per_m2 * vmr * 6.022e23 / 1e4
+        vmr = tgtvar * _vmr_scale(tgtvar)
+
+        overf['NO2_PER_CM2'] = n_per_m2 * vmr * _N_PER_CM2
         overf['NO2_PER_CM2'].attrs.update(overf['NO2'].attrs)
         overf['NO2_PER_CM2'].attrs['units'] = '1/cm**2'
-        ak = overf['AK_CMAQ'] = cls.cmaq_ak(overf, satl3f)
-        overf['ScatWt_CMAQ'] = cls.cmaq_sw(overf, satl3f)
+        # Interpolate scattering weights once for AK and AMF
+        q_sw = cls.cmaq_sw(overf, satl3f)
+        ak = overf['AK_CMAQ'] = cls.cmaq_ak(overf, satl3f, q_sw=q_sw)
+        overf['ScatWt_CMAQ'] = q_sw
         # uses AK for tropopause
         overf['VCDNO2_CMAQ'] = overf.csp.apply_ak('NO2_PER_CM2', ak / ak)
         # uses AK for vertical weighting
         overf['VCDNO2_CMAQ_OMI'] = overf.csp.apply_ak('NO2_PER_CM2', ak)
         # Recalculate satellite
-        amf = overf['AmfTropCMAQ'] = cls.cmaq_amf(overf, satl3f)
+        amf = overf['AmfTropCMAQ'] = cls.cmaq_amf(overf, satl3f, q_sw=q_sw)
         overf['VCDNO2_OMI_CMAQ'] = (
             satl3f['ColumnAmountNO2Trop'] * satl3f['AmfTrop'] / amf
         )
@@ -517,46 +832,23 @@ class OMHCHO(OMIL2):
         sat: OMI
             Satellite processing instance
         """
-        import xarray as xr
         omtmp = OMIL2.open_dataset(path, bbox=bbox, **kwargs)
         ds = omtmp.ds
-        ds['valid'] = (
-            (ds['MainDataQualityFlag'] == 0)
-            & ((ds['XtrackQualityFlagsExpanded'].astype('i') & 1) == 0)
-            & cloudleq(ds['AMFCloudFraction'], 0.3)
+        ds['valid'] = _all_valid(
+            ds['MainDataQualityFlag'] == 0,
+            _flag_clear(ds['XtrackQualityFlagsExpanded']),
+            cloudleq(ds['AMFCloudFraction'], 0.3),
+            *_bbox_conds(ds, bbox)
         )
+        if not ds['valid'].any():
+            raise ValueError(f'No valid pixels in {path} with {bbox}')
         ds['cn_x'] = ds['Longitude']
         ds['cn_y'] = ds['Latitude']
 
-        if bbox is not None:
-            swlon, swlat, nelon, nelat = bbox
-            ds['valid'] = (
-                ds['valid']
-                & (ds['Latitude'] >= swlat) & (ds['Latitude'] <= nelat)
-                & (ds['Longitude'] >= swlon) & (ds['Longitude'] <= nelon)
-            )
-        corners = {
-            'll': (slice(None, -1), slice(None, -1)),
-            'ul': (slice(None, -1), slice(1, None)),
-            'lu': (slice(1, None), slice(None, -1)),
-            'uu': (slice(1, None), slice(1, None)),
-        }
-        for key, (tslice, xslice) in corners.items():
-            ds[f'{key}_x'] = xr.DataArray(
-                ds['PixelCornerLongitudes'].isel(
-                    nTimes_1=tslice, nXtrack_1=xslice
-                ).transpose('nTimes_1', 'nXtrack_1').values,
-                dims=('nTimes', 'nXtrack')
-            )
-            ds[f'{key}_y'] = xr.DataArray(
-                ds['PixelCornerLatitudes'].isel(
-                    nTimes_1=tslice, nXtrack_1=xslice
-                ).transpose('nTimes_1', 'nXtrack_1').values,
-                dims=('nTimes', 'nXtrack')
-            )
+        _add_corners_from_edges(
+            ds, ds['PixelCornerLongitudes'], ds['PixelCornerLatitudes']
+        )
 
-        if not ds['valid'].any():
-            raise ValueError(f'No valid pixels in {path} with {bbox}')
         sat = cls()
         sat.ds = ds
         sat.bbox = bbox
@@ -583,10 +875,17 @@ class OMHCHO(OMIL2):
         q_sw : xr.DataArray
             Scattering Weights on the CMAQ grid
         """
+        import numpy as np
+        import xarray as xr
         from ...utils import coord_interp
         qpres_hpa = overf['PRES'] / 100
-        sat_press = satl3f['ClimatologyLevels'].copy()
-        sat_press.isel(nLevels=0)[:] = qpres_hpa.isel(LAY=0)
+        # Surface level is replaced by CMAQ surface pressure without copying
+        # and modifying the satellite levels.
+        climlev = satl3f['ClimatologyLevels']
+        levidx = xr.DataArray(
+            np.arange(climlev.sizes['nLevels']), dims=('nLevels',)
+        )
+        sat_press = climlev.where(levidx != 0, qpres_hpa.isel(LAY=0))
         q_sw = coord_interp(
             qpres_hpa,
             sat_press,
@@ -596,7 +895,7 @@ class OMHCHO(OMIL2):
         return q_sw
 
     @classmethod
-    def cmaq_amf(cls, overf, satl3f, key='FORM_PER_CM2'):
+    def cmaq_amf(cls, overf, satl3f, key='FORM_PER_CM2', q_sw=None):
         """
         Calculate an alternative Air Mass Factor (AMF) using satellite
         scattering weights and the CMAQ vertical profile as a partial column
@@ -613,20 +912,20 @@ class OMHCHO(OMIL2):
         key : str
             Key of the partial column density variable from CMAQ, which must
             have a LAY dimension that describes teh vertical coordinate.
+        q_sw : xr.DataArray
+            Optional, output of cmaq_sw if already available.
 
         Returns
         -------
         cmaqamf : xr.DataArray
             Air Mass Factor on the CMAQ grid
         """
-        q_sw = cls.cmaq_sw(overf, satl3f)
-        q_var = overf[key].where(~q_sw.isnull())
-        denom = q_var.sum('LAY')
-        cmaqamf = (q_sw * q_var).sum('LAY') / denom
-        return cmaqamf.where(denom != 0)
+        if q_sw is None:
+            q_sw = cls.cmaq_sw(overf, satl3f)
+        return _cmaq_amf(q_sw, overf[key])
 
     @classmethod
-    def cmaq_ak(cls, overf, satl3f):
+    def cmaq_ak(cls, overf, satl3f, q_sw=None):
         """
         Calculate an averaging kernel (AK) that would process CMAQ as though
         it were observed by the satellite. In this case, the averaging kernel
@@ -641,13 +940,16 @@ class OMHCHO(OMIL2):
         satl3f : xarray.Dataset
             Output from to_level3, paths_to_level3, or cmr_to_level3 with
             as_dataset=True (the default).
+        q_sw : xr.DataArray
+            Optional, output of cmaq_sw if already available.
 
         Returns
         -------
         q_ak : xr.DataArray
             Averaging kernel on the CMAQ grid
         """
-        q_sw = cls.cmaq_sw(overf, satl3f)
+        if q_sw is None:
+            q_sw = cls.cmaq_sw(overf, satl3f)
         q_ak = q_sw / satl3f['AirMassFactor']
         return q_ak
 
@@ -678,22 +980,19 @@ class OMHCHO(OMIL2):
         overf = qf.csp.mean_overpass(satellite='aura')
         n_per_m2 = overf.csp.mole_per_m2(add=True)
         tgtvar = overf[key]
-        if tgtvar.units.strip().startswith('ppm'):
-            vmr = tgtvar / 1e6
-        elif tgtvar.units.strip().startswith('ppb'):
-            vmr = tgtvar / 1e9
-        elif tgtvar.units.strip().startswith('ppt'):
-            vmr = tgtvar / 1e12
-        overf['FORM_PER_CM2'] = n_per_m2 * vmr * 6.022e23 / 1e4
-
-        ak = overf['FORM_AK_CMAQ'] = cls.cmaq_ak(overf, satl3f)
-        overf['FORM_SW_CMAQ'] = cls.cmaq_sw(overf, satl3f)
+        vmr = tgtvar * _vmr_scale(tgtvar)
+        overf['FORM_PER_CM2'] = n_per_m2 * vmr * _N_PER_CM2
+
+        # Interpolate scattering weights once for AK and AMF
+        q_sw = cls.cmaq_sw(overf, satl3f)
+        ak = overf['FORM_AK_CMAQ'] = cls.cmaq_ak(overf, satl3f, q_sw=q_sw)
+        overf['FORM_SW_CMAQ'] = q_sw
         # uses AK for tropopause
         overf['VCDFORM_CMAQ'] = overf.csp.apply_ak('FORM_PER_CM2', ak / ak)
         # uses AK for vertical weighting
         overf['VCDFORM_CMAQ_OMI'] = overf.csp.apply_ak('FORM_PER_CM2', ak)
         # Recalculate satellite
-        amf = overf['AMF_CMAQ'] = cls.cmaq_amf(overf, satl3f)
+        amf = overf['AMF_CMAQ'] = cls.cmaq_amf(overf, satl3f, q_sw=q_sw)
 
         overf['VCDHCHO_OMI_CMAQ'] = (
             satl3f['ColumnAmount'] * satl3f['AirMassFactor'] / amf
@@ -754,60 +1053,25 @@ class OMO3PR(OMIL2):
             Satellite processing instance
         """
         import xarray as xr
-        import numpy as np
 
         omtmp = OMIL2.open_dataset(path, bbox=bbox, **kwargs)
         ds = omtmp.ds
-        ds['valid'] = ~(ds['O3'].isnull().all('nLayers'))
+        ds['valid'] = _all_valid(
+            ~(ds['O3'].isnull().all('nLayers')),
+            *_bbox_conds(ds, bbox)
+        )
+        if not ds['valid'].any():
+            raise ValueError(f'No valid pixels in {path} with {bbox}')
         ds['cn_x'] = ds['Longitude']
         ds['cn_y'] = ds['Latitude']
 
-        if bbox is not None:
-            swlon, swlat, nelon, nelat = bbox
-            ds['valid'] = (
-                ds['valid']
-                & (ds['Latitude'] >= swlat) & (ds['Latitude'] <= nelat)
-                & (ds['Longitude'] >= swlon) & (ds['Longitude'] <= nelon)
-            )
-
-        times = ds.nTimes.values
-        times_edges = xr.DataArray(
-            np.concatenate([times[:1], times[1:] - 0.5, times[-1:]]),
-            dims=('nTimes_1',)
-        )
-        xtrack = ds.nXtrack.values
-        xtrack_edges = xr.DataArray(
-            np.concatenate([xtrack[:1], xtrack[1:] - 0.5, xtrack[-1:]]),
-            dims=('nXtrack_1',)
-        )
-        lat_edges = ds.Latitude.interp(
-            nTimes=times_edges,
-            nXtrack=xtrack_edges,
-        )
-        lon_edges = ds.Longitude.interp(
-            nTimes=times_edges,
-            nXtrack=xtrack_edges,
-        )
+        edgedims = ('nTimes_1', 'nXtrack_1')
+        lat = ds['Latitude'].transpose('nTimes', 'nXtrack')
+        lon = ds['Longitude'].transpose('nTimes', 'nXtrack')
+        lat_edges = xr.DataArray(_cell_edges(lat.values), dims=edgedims)
+        lon_edges = xr.DataArray(_cell_edges(lon.values), dims=edgedims)
 
-        corners = {
-            'll': (slice(None, -1), slice(None, -1)),
-            'ul': (slice(None, -1), slice(1, None)),
-            'lu': (slice(1, None), slice(None, -1)),
-            'uu': (slice(1, None), slice(1, None)),
-        }
-        for key, (tslice, xslice) in corners.items():
-            ds[f'{key}_x'] = xr.DataArray(
-                lon_edges.isel(
-                    nTimes_1=tslice, nXtrack_1=xslice
-                ).transpose('nTimes_1', 'nXtrack_1').values,
-                dims=('nTimes', 'nXtrack')
-            )
-            ds[f'{key}_y'] = xr.DataArray(
-                lat_edges.isel(
-                    nTimes_1=tslice, nXtrack_1=xslice
-                ).transpose('nTimes_1', 'nXtrack_1').values,
-                dims=('nTimes', 'nXtrack')
-            )
+        _add_corners_from_edges(ds, lon_edges, lat_edges)
         """
         o3du = ds['O3'].sel(nLayers=[15, 16])
         dp = ds['Pressure'].sel(nLevels=slice(15, 17)).diff('nLevels')
@@ -819,8 +1083,6 @@ class OMO3PR(OMIL2):
         o3ppm.attrs['units'] = 'ppm'
         ds['O3_500hPa_ppm'] = o3ppm
         """
-        if not ds['valid'].any():
-            raise ValueError(f'No valid pixels in {path} with {bbox}')
         sat = cls()
         sat.ds = ds
         sat.bbox = bbox
@@ -837,7 +1099,7 @@ class OMPROFOZ(OMIL2):
       * AMFCloudFraction <= 0.3
     """
     _defaultkeys = (
-        'O3TotalColumn', 'O3TroposphericColumn', 'O3Retrieved500hPa'
+        'O3TotalColumn', 'O3TroposphericColumn', 'O3Retrieved500hPa',
         'AirMassFactor', 'ScatteringWeights', 'ClimatologyLevels'
     )
 
@@ -880,44 +1142,23 @@ class OMPROFOZ(OMIL2):
         sat: OMI
             Satellite processing instance
         """
-        import xarray as xr
         omtmp = OMIL2.open_dataset(path, bbox=bbox, **kwargs)
         ds = omtmp.ds
-        ds['valid'] = ~(
-            (ds['ExitStatus'] <= 0) | (ds['ExitStatus'] >= 10)
-            | (ds['RMS'].max('nChannel') > 3)
-            | (ds['AverageResiduals'].max('nChannel') >= 3)
-            | ~cloudleq(ds['EffectiveCloudFraction'], 0.3)
+        ds['valid'] = _all_valid(
+            ~(ds['ExitStatus'] <= 0),
+            ~(ds['ExitStatus'] >= 10),
+            ~(ds['RMS'].max('nChannel') > 3),
+            ~(ds['AverageResiduals'].max('nChannel') >= 3),
+            cloudleq(ds['EffectiveCloudFraction'], 0.3),
+            *_bbox_conds(ds, bbox)
         )
+        if not ds['valid'].any():
+            raise ValueError(f'No valid pixels in {path} with {bbox}')
         ds['cn_x'] = ds['Longitude']
         ds['cn_y'] = ds['Latitude']
-
-        if bbox is not None:
-            swlon, swlat, nelon, nelat = bbox
-            ds['valid'] = (
-                ds['valid']
-                & (ds['Latitude'] >= swlat) & (ds['Latitude'] <= nelat)
-                & (ds['Longitude'] >= swlon) & (ds['Longitude'] <= nelon)
-            )
-        corners = {
-            'll': (slice(None, -1), slice(None, -1)),
-            'ul': (slice(None, -1), slice(1, None)),
-            'lu': (slice(1, None), slice(None, -1)),
-            'uu': (slice(1, None), slice(1, None)),
-        }
-        for key, (tslice, xslice) in corners.items():
-            ds[f'{key}_x'] = xr.DataArray(
-                ds['LongitudePixelCorner'].isel(
-                    nTimes_1=tslice, nXtrack_1=xslice
-                ).transpose('nTimes_1', 'nXtrack_1').values,
-                dims=('nTimes', 'nXtrack')
-            )
-            ds[f'{key}_y'] = xr.DataArray(
-                ds['LatitudePixelCorner'].isel(
-                    nTimes_1=tslice, nXtrack_1=xslice
-                ).transpose('nTimes_1', 'nXtrack_1').values,
-                dims=('nTimes', 'nXtrack')
-            )
+        _add_corners_from_edges(
+            ds, ds['LongitudePixelCorner'], ds['LatitudePixelCorner']
+        )
         ds['O3Retrieved500hPa'] = ds['O3RetrievedProfile'].sel(nLayer=22)
         dp = ds['ProfileLevelPressure'].sel(
             nLayer_1=slice(22, 24)
@@ -931,8 +1172,6 @@ class OMPROFOZ(OMIL2):
         o3ppm.attrs.update(ds['O3Retrieved500hPa'].attrs)
         o3ppm.attrs['units'] = 'ppm'
         ds['O3Retrieved500hPa_ppm'] = o3ppm
-        if not ds['valid'].any():
-            raise ValueError(f'No valid pixels in {path} with {bbox}')
         sat = cls()
         sat.ds = ds
         sat.bbox = bbox
@@ -1,5 +1,5 @@
 __all__ = ['OMPS_NPP_L2', 'OMPS_NPP_NMNO2_L2', 'OMPS_NPP_NMTO3_L2']
-from ..core import satellite
+from ..core import satellite, _any_positions
 
 
 class OMPS_NPP_L2(satellite):
@@ -119,14 +119,15 @@ class OMPS_NPP_L2(satellite):
         import numpy as np
         if bbox is not None:
             swlon, swlat, nelon, nelat = bbox
-            lldf = ds[['Latitude', 'Longitude']].to_dataframe().query(
-                f'Latitude >= {swlat} and Latitude <= {nelat}'
-                + f' and Longitude >= {swlon} and Longitude <= {nelon}'
+            inbbox = (
+                (ds['Latitude'] >= swlat) & (ds['Latitude'] <= nelat)
+                & (ds['Longitude'] >= swlon) & (ds['Longitude'] <= nelon)
             )
-            sval = lldf.index.get_level_values('DimAlongTrack').unique()
+            lines = _any_positions(inbbox.values, inbbox.dims)
+            sval = ds['DimAlongTrack'].values[lines['DimAlongTrack']]
             # Not subsetting pixel dimension, because I want to use
             # the cross ways dimension in the interpolation to corners
-            if len(sval) < 0:
+            if len(sval) == 0:
                 raise ValueError(f'{path} has no values in {bbox}')
 
             ds = ds.sel(
@@ -268,7 +269,7 @@ class OMPS_NPP_NMNO2_L2(OMPS_NPP_L2):
 
 
 class OMPS_NPP_NMTO3_L2(OMPS_NPP_L2):
-    _defaultkeys = ('ColumnAmountO3')
+    _defaultkeys = ('ColumnAmountO3',)
     __doc__ = """
     Default OMPS O3 satellite processor.
     * valid when
@@ -2,7 +2,7 @@ __all__ = [
     'TropOMI', 'S5P_L2__NO2___', 'S5P_L2__CO____', 'S5P_L2__HCHO__',
     'S5P_L2__CH4___'
 ]
-from ..core import satellite
+from ..core import satellite, _any_positions
 import numpy as np
 
 
@@ -169,14 +169,15 @@ class TropOMI(satellite):
         import numpy as np
         if bbox is not None:
             swlon, swlat, nelon, nelat = bbox
-            lldf = ds[['latitude', 'longitude']].to_dataframe().query(
-                f'latitude >= {swlat} and latitude <= {nelat}'
-                + f' and longitude >= {swlon} and longitude <= {nelon}'
+            inbbox = (
+                (ds['latitude'] >= swlat) & (ds['latitude'] <= nelat)
+                & (ds['longitude'] >= swlon) & (ds['longitude'] <= nelon)
             )
-            sval = lldf.index.get_level_values('scanline').unique()
+            lines = _any_positions(inbbox.values, inbbox.dims)
+            sval = ds['scanline'].values[lines['scanline']]
             # Not subsetting pixel dimension, because I want to use
             # the cross ways dimension in the interpolation to corners
-            if len(sval) < 0:
+            if len(sval) == 0:
                 raise ValueError(f'{path} has no values in {bbox}')
 
             ds = ds.sel(scanline=slice(sval.min() - 1, sval.max() + 1))
@@ -1,6 +1,72 @@
 __all__ = ['L2_VIIRS_SNPP', 'AERDB_L2_VIIRS_SNPP', 'AERDT_L2_VIIRS_SNPP']
 # https://ladsweb.modaps.eosdis.nasa.gov/opendap/allData/5110/AERDB_L2_VIIRS_SNPP/contents.html
+from copy import copy
+import functools
+import re
+
+import numpy as np
+import xarray as xr
+
 from .. import satellite
+from ..core import _any_positions, _default_chunks, _in_bbox
+from ..core import _pop_decode_kwargs
+from ...utils import getcmrlinks, _cell_edges
+
+
+def _href_filter(pattern):
+    """
+    Arguments
+    ---------
+    pattern : str
+        Regular expression that must match the whole href
+
+    Returns
+    -------
+    filterfunc : function
+        Takes a link dictionary from CMR and returns True if its href matches
+    """
+    match = re.compile(pattern, re.DOTALL).fullmatch
+    return lambda link: match(link['href']) is not None
+
+
+# CMR link filters by cmr_links method; VIIRS OpenDAP links end in .nc.html
+_link_filters = {
+    'opendap': _href_filter(r'(?=.*opendap).*\.nc\.html'),
+    'download': _href_filter(r'http(?!.*opendap).*(?:he5|nc)'),
+    's3': _href_filter(r's3(?!.*opendap).*(?:he5|nc)'),
+}
+
+
+@functools.lru_cache(maxsize=32)
+def _cmr_links(method, kwditems):
+    """
+    Arguments
+    ---------
+    method : str
+        'opendap', 'download', or 's3'.
+    kwditems : tuple
+        Sorted (key, value) pairs passed as keywords to getcmrlinks
+
+    Returns
+    -------
+    links : tuple
+        Links for download or OpenDAP or s3
+    """
+    kwds = dict(kwditems)
+    kwds.setdefault('filterfunc', _link_filters[method])
+    links = getcmrlinks(**kwds)
+    if method == 'opendap':
+        links = [link.replace('.html', '') for link in links]
+    return tuple(links)
+
+
+# Pixel corners as (line, pixel) slices of edge arrays
+_edge_corners = {
+    'll': (slice(None, -1), slice(None, -1)),
+    'lu': (slice(None, -1), slice(1, None)),
+    'uu': (slice(1, None), slice(1, None)),
+    'ul': (slice(1, None), slice(None, -1)),
+}
 
 
 class L2_VIIRS_SNPP(satellite):
@@ -12,7 +78,9 @@ class L2_VIIRS_SNPP(satellite):
     _defaultkeys = ('Optical_Depth_Land_And_Ocean', 'Land_Ocean_Quality_Flag')
 
     @classmethod
-    def _open_hierarchical_dataset(cls, path, bbox=None, isvalid=2, **kwargs):
+    def _open_hierarchical_dataset(
+        cls, path, bbox=None, isvalid=2, with_corners=True, **kwargs
+    ):
         """
         Convenience function to promote groups geophysical_data and
         geolocation_data from groups into the main xarray.Dataset object.
@@ -21,10 +89,13 @@ class L2_VIIRS_SNPP(satellite):
         ---------
         path : str
             Path to a L2_VIIRS_SNPP OpenDAP-style file
-        bbox : iterable
-            swlon, swlat, nelon, nelat in decimal degrees East and North
+        bbox : iterable or shapely geometry
+            swlon, swlat, nelon, nelat in decimal degrees East and North, or
+            a geometry (e.g., a polygon) in decimal degrees
         isvalid : float
             Minimum value of flag for valid date (flag>=isvalid)
+        with_corners : bool
+            If False, skip pixel corners (see prep_dataset).
         kwargs : mappable
             Passed to xarray.open_dataset
 
@@ -33,16 +104,19 @@ class L2_VIIRS_SNPP(satellite):
         sat: L2_VIIRS_SNPP
             Satellite processing instance
         """
-        import xarray as xr
+        _default_chunks(kwargs)
         datakey = 'geophysical_data'
         geokey = 'geolocation_data'
 
-        dss = [
-            xr.open_dataset(path, group=datakey, **kwargs),
-            xr.open_dataset(path, group=geokey, **kwargs),
-        ]
-        ds = xr.merge(dss)
-        ds = cls.prep_dataset(ds, bbox=bbox, isvalid=isvalid, path=path)
+        # Groups are opened one at a time: netCDF4/HDF5 metadata reads are
+        # not thread safe in default builds, and the opens are lazy anyway.
+        ds = xr.merge([
+            xr.open_dataset(path, group=group, **kwargs)
+            for group in (datakey, geokey)
+        ])
+        ds = cls.prep_dataset(
+            ds, bbox=bbox, isvalid=isvalid, path=path, with_corners=with_corners
+        )
         sat = cls()
         sat.path = path
         sat.ds = ds
@@ -50,7 +124,9 @@ class L2_VIIRS_SNPP(satellite):
         return sat
 
     @classmethod
-    def open_dataset(cls, path, bbox=None, isvalid=2, **kwargs):
+    def open_dataset(
+        cls, path, bbox=None, isvalid=2, with_corners=True, **kwargs
+    ):
         """
         Open a local or remote path as a VIIRS satellite processor.
 
@@ -58,86 +134,132 @@ class L2_VIIRS_SNPP(satellite):
         ---------
         path : str
             Path to a L2_VIIRS_SNPP OpenDAP-style file
-        bbox : iterable
-            swlon, swlat, nelon, nelat in decimal degrees East and North
+        bbox : iterable or shapely geometry
+            swlon, swlat, nelon, nelat in decimal degrees East and North, or
+            a geometry (e.g., a polygon) in decimal degrees
         isvalid : float
             Minimum value of flag for valid date (flag>=isvalid)
+        with_corners : bool
+            If False, skip pixel corners (see prep_dataset).
         kwargs : mappable
-            Passed to xarray.open_dataset
+            Passed to xarray.open_dataset. If dask is available, chunks
+            defaults to {} so that variables are read lazily.
 
         Returns
         -------
         sat: L2_VIIRS_SNPP
             Satellite processing instance
         """
-        import xarray as xr
-
-        ds = xr.open_dataset(path, **kwargs).reset_coords()
+        _default_chunks(kwargs)
+        # Probe without decoding; hierarchical files have an empty root
+        decode_cf, decodekw = _pop_decode_kwargs(kwargs)
+        ds = xr.open_dataset(path, decode_cf=False, **kwargs)
         if len(ds.dims) == 0:
+            ds.close()
             return cls._open_hierarchical_dataset(
-                path, bbox=bbox, isvalid=isvalid, **kwargs
+                path, bbox=bbox, isvalid=isvalid, with_corners=with_corners,
+                decode_cf=decode_cf, **decodekw, **kwargs
             )
-        ds = cls.prep_dataset(ds, bbox=bbox, path=path, isvalid=isvalid)
+        if decode_cf:
+            ds = xr.decode_cf(ds, **decodekw)
+        ds = ds.reset_coords()
+        ds = cls.prep_dataset(
+            ds, bbox=bbox, path=path, isvalid=isvalid, with_corners=with_corners
+        )
         sat = cls()
         sat.path = path
         sat.ds = ds
         sat.bbox = bbox
         return sat
 
+    @classmethod
+    def _prep(cls, ds, bbox, path, lonkey, latkey, dims, with_corners=True):
+        """
+        Shared part of prep_dataset: crops scan lines and pixels to bbox and
+        adds pixel corners (ll_x, ll_y, ... ul_x, ul_y) from interpolated
+        lat/lon.
+
+        Arguments
+        ---------
+        ds : xarray.Dataset
+            Satellite dataset
+        bbox : iterable or shapely geometry
+            swlon, swlat, nelon, nelat in decimal degrees East and North, or
+            a geometry (e.g., a polygon) in decimal degrees
+        path : str
+            Used in error messages
+        lonkey, latkey : str
+            Names of the longitude and latitude variables
+        dims : tuple
+            Along-track (scan line) and cross-track dimension names
+        with_corners : bool
+            If False, only crop to bbox.
+
+        Returns
+        -------
+        ds : xarray.Dataset
+        """
+        if bbox is None and not with_corners:
+            return ds
+        # lon/lat are read once for both the crop and the corners
+        lonlat = ds[[lonkey, latkey]].to_array().transpose(..., *dims).values
+        if bbox is not None:
+            inbbox = _in_bbox(bbox, *lonlat)
+            lines, pixels = _any_positions(inbbox, dims).values()
+            if lines.size == 0:
+                raise ValueError(f'{path} has no values in {bbox}')
+            l0, l1 = lines[0], lines[-1] + 1
+            p0, p1 = pixels[0], pixels[-1] + 1
+            ds = ds.isel({dims[0]: slice(l0, l1), dims[1]: slice(p0, p1)})
+            if not with_corners:
+                return ds
+            # Keep a neighboring line and pixel on each side while making
+            # edges so that corners of the kept pixels are the same as
+            # uncropped.
+            nl, npx = lonlat.shape[-2:]
+            g0, g1 = max(l0 - 1, 0), min(l1 + 1, nl)
+            h0, h1 = max(p0 - 1, 0), min(p1 + 1, npx)
+            edges = _cell_edges(lonlat[:, g0:g1, h0:h1])[
+                :, l0 - g0:l1 - g0 + 1, p0 - h0:p1 - h0 + 1
+            ]
+        else:
+            edges = _cell_edges(lonlat)
+        # One (2, N + 1, M + 1) buffer; corners are views into it
+        lon_edges, lat_edges = edges
+        # (dims, array) assignment picks up ds coords without re-validating
+        for cornerkey, corner_slice in _edge_corners.items():
+            ds[f'{cornerkey}_y'] = dims, lat_edges[corner_slice]
+            ds[f'{cornerkey}_x'] = dims, lon_edges[corner_slice]
+        return ds
+
     @classmethod
     def cmr_links(cls, method='opendap', **kwds):
         """
         Reimplemenation of satellite.cmr_links to account for html links in
         VIIRS OpenDAP links in the CMR.
 
+        Results are cached per process for identical (hashable) keywords, so
+        repeated searches do not query the CMR again. The cache holds tuples
+        and each call returns a new list, so callers may modify it.
+
         Arguments
         ---------
         method : str
             'opendap', 'download', or 's3'.
+        kwds : mappable
+            Passed to getcmrlinks
 
         Returns
         -------
         links : list
             List of links for download or OpenDAP or s3
         """
-        from copy import copy
-        from ...utils import getcmrlinks
-        kwds = copy(kwds)
-        down_f = (
-            lambda x: (
-                'opendap' not in x['href']
-                and (
-                    x['href'].endswith('he5')
-                    or x['href'].endswith('nc')
-                )
-                and x['href'].startswith('http')
-            )
-        )
-        s3_f = (
-            lambda x: (
-                'opendap' not in x['href']
-                and (
-                    x['href'].endswith('he5')
-                    or x['href'].endswith('nc')
-                )
-                and x['href'].startswith('s3')
-            )
-        )
-        open_f = (
-            lambda x: (
-                'opendap' in x['href'] and x['href'].endswith('.nc.html')
-            )
-        )
-        kwds.setdefault(
-            'filterfunc', {
-                'opendap': open_f, 's3': s3_f, 'download': down_f
-            }[method]
-        )
-
-        links = getcmrlinks(**kwds)
-        if method == 'opendap':
-            links = [link.replace('.html', '') for link in links]
-        return links
+        kwditems = tuple(sorted(kwds.items()))
+        try:
+            hash(kwditems)
+        except TypeError:
+            return list(_cmr_links.__wrapped__(method, kwditems))
+        return list(_cmr_links(method, kwditems))
 
 
 class AERDT_L2_VIIRS_SNPP(L2_VIIRS_SNPP):
@@ -163,13 +285,14 @@ class AERDT_L2_VIIRS_SNPP(L2_VIIRS_SNPP):
         links : list
             List of links for download or OpenDAP or s3
         """
-        from copy import copy
         kwargs = copy(kwargs)
         kwargs.setdefault('concept_id', 'C1688453112-LAADS')
         return L2_VIIRS_SNPP.cmr_links(method=method, **kwargs)
 
     @classmethod
-    def prep_dataset(cls, ds, bbox=None, isvalid=2, path=None):
+    def prep_dataset(
+        cls, ds, bbox=None, isvalid=2, path=None, with_corners=True
+    ):
         """
         Applies spatial subset based on Latitude and Longitude, also
         interpolates pixel centers to corners and applies valid flags:
@@ -180,74 +303,33 @@ class AERDT_L2_VIIRS_SNPP(L2_VIIRS_SNPP):
         ---------
         ds : xarray.Dataset
             Satellite dataset
-        bbox : iterable
-            swlon, swlat, nelon, nelat in decimal degrees East and North
+        bbox : iterable or shapely geometry
+            swlon, swlat, nelon, nelat in decimal degrees East and North, or
+            a geometry (e.g., a polygon) in decimal degrees
         isvalid : float
             Value greater than or equal to 2 are valid.
         path : str
             Unused.
+        with_corners : bool
+            If False, pixel corners (ll_x, ll_y, ... ul_x, ul_y) are not
+            computed. This is faster when only values are needed (e.g.,
+            to_dataframe without geo), but the result cannot be gridded with
+            to_level3.
 
         Returns
         -------
         ds : xarray.Dataset
         """
-        import xarray as xr
-        import numpy as np
-
-        if bbox is not None:
-            swlon, swlat, nelon, nelat = bbox
-            df = ds[['latitude', 'longitude']].to_dataframe()
-            df = df.query(
-                f'latitude >= {swlat} and latitude <= {nelat}'
-                + f' and longitude >= {swlon} and longitude <= {nelon}'
-            )
-            lines = df.index.get_level_values('number_of_lines_8x8').unique()
-            if len(lines) < 0:
-                raise ValueError(f'{path} has no values in {bbox}')
-            ds = ds.isel(
-                number_of_lines_8x8=slice(lines.min(), lines.max() + 1)
-            )
-        scanline = ds.number_of_lines_8x8.values
-        scanline_edges = xr.DataArray(
-            np.concatenate([scanline[:1], scanline[1:] - 0.5, scanline[-1:]]),
-            dims=('number_of_lines_8x8',)
-        )
-        pixel = ds.number_of_pixels_8x8.values
-        pixel_edges = xr.DataArray(
-            np.concatenate([pixel[:1], pixel[1:] - 0.5, pixel[-1:]]),
-            dims=('number_of_pixels_8x8',)
-        )
-
-        lat_edges = ds.latitude.interp(
-            number_of_lines_8x8=scanline_edges,
-            number_of_pixels_8x8=pixel_edges,
-        )
-        lon_edges = ds.longitude.interp(
-            number_of_lines_8x8=scanline_edges,
-            number_of_pixels_8x8=pixel_edges,
-        )
-        dims = ('number_of_lines_8x8', 'number_of_pixels_8x8')
-        corner_slices = {
-            'll': (slice(None, -1), slice(None, -1)),
-            'lu': (slice(None, -1), slice(1, None)),
-            'uu': (slice(1, None), slice(1, None)),
-            'ul': (slice(1, None), slice(None, -1)),
-        }
-        coords = {
-            'number_of_lines_8x8': ds.coords['number_of_lines_8x8'],
-            'number_of_pixels_8x8': ds.coords['number_of_pixels_8x8'],
-        }
-        for cornerkey, corner_slice in corner_slices.items():
-            ds[f'{cornerkey}_y'] = xr.DataArray(
-                lat_edges[corner_slice], dims=dims, coords=coords
-            )
-            ds[f'{cornerkey}_x'] = xr.DataArray(
-                lon_edges[corner_slice], dims=dims, coords=coords
-            )
-        ds['valid'] = (
-            (ds['Land_Ocean_Quality_Flag'] >= isvalid)
-            & (~ds['Optical_Depth_Land_And_Ocean'].isnull())
+        ds = cls._prep(
+            ds, bbox, path, 'longitude', 'latitude',
+            ('number_of_lines_8x8', 'number_of_pixels_8x8'),
+            with_corners=with_corners
         )
+        aod = ds['Optical_Depth_Land_And_Ocean']
+        qa = ds['Land_Ocean_Quality_Flag'].transpose(*aod.dims)
+        valid = qa.data >= isvalid
+        valid &= np.isfinite(aod.data)
+        ds['valid'] = aod.dims, valid
         return ds
 
     @classmethod
@@ -307,13 +389,14 @@ class AERDB_L2_VIIRS_SNPP(L2_VIIRS_SNPP):
         links : list
             List of links for download or OpenDAP or s3
         """
-        from copy import copy
         kwargs = copy(kwargs)
         kwargs.setdefault('concept_id', 'C2600303218-LAADS')
         return L2_VIIRS_SNPP.cmr_links(method=method, **kwargs)
 
     @classmethod
-    def prep_dataset(cls, ds, bbox=None, isvalid=2, path=None):
+    def prep_dataset(
+        cls, ds, bbox=None, isvalid=2, path=None, with_corners=True
+    ):
         """
         Applies spatial subset based on Latitude and Longitude, also
         interpolates pixel centers to corners and applies valid flags:
@@ -326,81 +409,39 @@ class AERDB_L2_VIIRS_SNPP(L2_VIIRS_SNPP):
         ---------
         ds : xarray.Dataset
             Satellite dataset
-        bbox : iterable
-            swlon, swlat, nelon, nelat in decimal degrees East and North
+        bbox : iterable or shapely geometry
+            swlon, swlat, nelon, nelat in decimal degrees East and North, or
+            a geometry (e.g., a polygon) in decimal degrees
         isvalid : float
             Value greater than or equal to 2 are valid.
         path : str
             Unused.
+        with_corners : bool
+            If False, pixel corners (ll_x, ll_y, ... ul_x, ul_y) are not
+            computed. This is faster when only values are needed (e.g.,
+            to_dataframe without geo), but the result cannot be gridded with
+            to_level3.
 
         Returns
         -------
         ds : xarray.Dataset
         """
-        import xarray as xr
-        import numpy as np
-
-        if bbox is not None:
-            swlon, swlat, nelon, nelat = bbox
-            df = ds[['Latitude', 'Longitude']].to_dataframe()
-            df = df.query(
-                f'Latitude >= {swlat} and Latitude <= {nelat}'
-                + f' and Longitude >= {swlon} and Longitude <= {nelon}'
-            )
-            lines = df.index.get_level_values('Idx_Atrack').unique()
-            if len(lines) < 0:
-                raise ValueError(f'{path} has no values in {bbox}')
-            ds = ds.sel(
-                Idx_Atrack=slice(lines.min(), lines.max() + 1)
-            )
-        scanline = ds.Idx_Atrack.values
-        scanline_edges = xr.DataArray(
-            np.concatenate([scanline[:1], scanline[1:] - 0.5, scanline[-1:]]),
-            dims=('Idx_Atrack',)
-        )
-        pixel = ds.Idx_Xtrack.values
-        pixel_edges = xr.DataArray(
-            np.concatenate([pixel[:1], pixel[1:] - 0.5, pixel[-1:]]),
-            dims=('Idx_Xtrack',)
+        ds = cls._prep(
+            ds, bbox, path, 'Longitude', 'Latitude',
+            ('Idx_Atrack', 'Idx_Xtrack'), with_corners=with_corners
         )
-
-        lat_edges = ds.Latitude.interp(
-            Idx_Atrack=scanline_edges,
-            Idx_Xtrack=pixel_edges,
-        )
-        lon_edges = ds.Longitude.interp(
-            Idx_Atrack=scanline_edges,
-            Idx_Xtrack=pixel_edges,
-        )
-        dims = ('Idx_Atrack', 'Idx_Xtrack')
-        corner_slices = {
-            'll': (slice(None, -1), slice(None, -1)),
-            'lu': (slice(None, -1), slice(1, None)),
-            'uu': (slice(1, None), slice(1, None)),
-            'ul': (slice(1, None), slice(None, -1)),
-        }
-        coords = {
-            'Idx_Atrack': ds.coords['Idx_Atrack'],
-            'Idx_Xtrack': ds.coords['Idx_Xtrack'],
-        }
         ds['cn_x'] = ds['Longitude']
         ds['cn_y'] = ds['Latitude']
-        for cornerkey, corner_slice in corner_slices.items():
-            ds[f'{cornerkey}_y'] = xr.DataArray(
-                lat_edges[corner_slice], dims=dims, coords=coords
-            )
-            ds[f'{cornerkey}_x'] = xr.DataArray(
-                lon_edges[corner_slice], dims=dims, coords=coords
-            )
-        ds['valid'] = (
-            (
-                (ds['Aerosol_Optical_Thickness_QA_Flag_Land'] >= isvalid)
-                | (ds['Aerosol_Optical_Thickness_QA_Flag_Ocean'] >= isvalid)
-            )
-            & (~ds[
-                'Aerosol_Optical_Thickness_550_Land_Ocean_Best_Estimate'
-            ].isnull())
-        )
+        aod = ds['Aerosol_Optical_Thickness_550_Land_Ocean_Best_Estimate']
+        qal, qao = [
+            ds[f'Aerosol_Optical_Thickness_QA_Flag_{k}'].transpose(*aod.dims)
+            for k in ('Land', 'Ocean')
+        ]
+        # in-place updates reuse one boolean buffer for numpy inputs
+        valid = qal.data >= isvalid
+        valid |= qao.data >= isvalid
+        valid &= np.isfinite(aod.data)
+        ds['valid'] = aod.dims, valid
         return ds
 
     @classmethod
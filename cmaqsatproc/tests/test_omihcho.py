@@ -134,3 +134,26 @@ def test_open_dataset():
         ds.to_netcdf(outpath)
         sat = readers.omi.OMHCHO.open_dataset(outpath)
         checksat(sat)
+
+
+def test_open_mfdataset():
+    import tempfile
+    import os
+    import pytest
+
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        okpath = os.path.join(tmpdirname, 'testomihcho.nc')
+        ds = omi_example_ds()
+        ds.to_netcdf(okpath)
+        # a granule with no valid pixels is skipped, not fatal
+        badpath = os.path.join(tmpdirname, 'testomihcho_invalid.nc')
+        ds['MainDataQualityFlag'][:] = 2
+        ds.to_netcdf(badpath)
+        sat = readers.omi.OMHCHO.open_mfdataset([okpath, badpath])
+        assert (sat.path == [okpath])
+        assert (badpath in sat.ds.attrs['history'])
+        checksat(sat)
+        # an unreadable granule is an error, not silently dropped data
+        missingpath = os.path.join(tmpdirname, 'missing.nc')
+        with pytest.raises(FileNotFoundError):
+            readers.omi.OMHCHO.open_mfdataset([okpath, missingpath])
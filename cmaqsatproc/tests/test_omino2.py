@@ -106,3 +106,33 @@ def test_open_dataset():
         ds.to_netcdf(outpath)
         sat = readers.omi.OMNO2.open_dataset(outpath)
         checksat(sat)
+
+
+def test_parse_dimlists():
+    struct = """GROUP=SwathStructure
+    GROUP=GeoField
+        OBJECT=GeoField_1
+            GeoFieldName="Latitude"
+            DataType=H5T_NATIVE_FLOAT
+            DimList=("nTimes","nXtrack")
+            MaxdimList=("nTimes","nXtrack")
+        END_OBJECT=GeoField_1
+    END_GROUP=GeoField
+    GROUP=DataField
+        OBJECT=DataField_1
+            DataFieldName="TerrainPressure"
+            DimList=("nTimes+1","nXtrackp1")
+        END_OBJECT=DataField_1
+        OBJECT=DataField_2
+            DataFieldName="Wavelength"
+            DimList=("3")
+        END_OBJECT=DataField_2
+    END_GROUP=DataField
+END_GROUP=SwathStructure
+"""
+    dimassignments = readers.omi._parse_dimlists(struct)
+    assert (dimassignments == {
+        'Latitude': ('nTimes', 'nXtrack'),
+        'TerrainPressure': ('nTimes_1', 'nXtrack_1'),
+        'Wavelength': ('n3',),
+    })
@@ -61,6 +61,28 @@ def dataset_example():
     return ds
 
 
+def example_paths(tmpdirname, n=3):
+    import os
+    paths = []
+    for i in range(n):
+        ds = dataset_example()
+        ds['Val'] = ds['Val'] + i
+        ds['Val'].attrs.update(units='DU', long_name=f'Val{i}')
+        path = os.path.join(tmpdirname, f'example{i}.nc')
+        ds.to_netcdf(path)
+        paths.append(path)
+    return paths
+
+
+def grid_example():
+    import geopandas as gpd
+    from shapely.geometry import box
+    return gpd.GeoDataFrame(
+        dict(ROW=[0, 0], COL=[0, 1]),
+        geometry=[box(-93, 40, -91, 42), box(-91, 40, -89, 42)], crs=4326
+    ).set_index(['ROW', 'COL'])
+
+
 def test_satellite():
     import numpy as np
     import geopandas as gpd
@@ -82,3 +104,131 @@ def test_satellite():
     with warnings.catch_warnings(record=True):
         l3 = sat.to_level3('Val', grid=gdf[['geometry']])
     assert ((l3['Val'].values.ravel() == gdf['Val'].values).all())
+
+
+def test_geometry_cache():
+    import numpy as np
+    import warnings
+    ds = dataset_example()
+    grid = grid_example()
+    sat = readers.satellite.from_dataset(ds)
+    # geometry of all pixels must not be reused for valid pixels
+    assert (sat.to_dataframe(geo=True, valid=False).shape[0] == 6)
+    assert (sat.to_dataframe(geo=True).shape[0] == 4)
+    with warnings.catch_warnings(record=True):
+        l3 = sat.to_level3('Val', grid=grid)
+        fresh = readers.satellite.from_dataset(ds).to_level3('Val', grid=grid)
+    for key in ['Val', 'weight_sum', 'count']:
+        assert (np.allclose(l3[key], fresh[key]))
+
+
+def test_pixel_frame():
+    import numpy as np
+    ds = dataset_example()
+    sat = readers.satellite.from_dataset(ds)
+    df = sat.to_dataframe('Val')
+    # returned frames are copies of the cached frame
+    df['Val'] = 0
+    assert (np.allclose(sat.to_dataframe('Val')['Val'], [1, 2, 3, 4]))
+    gdf = sat.to_dataframe('Val', geo=True)
+    assert (gdf.index.equals(sat.to_dataframe(geo=True).index))
+    # a replaced variable is read again
+    sat.ds['Val'] = sat.ds['Val'] * 2
+    assert (np.allclose(sat.to_dataframe('Val')['Val'], [2, 4, 6, 8]))
+    alldf = sat.to_dataframe('Val', valid=False)
+    assert (np.allclose(alldf['Val'], [2, -1998, 4, 6, -1998, 8]))
+
+
+def test_in_bbox():
+    import numpy as np
+    from shapely.geometry import box, Polygon
+    from ..readers.core import _in_bbox
+    x, y = np.meshgrid(np.arange(5.), np.arange(5.))
+    inbox = _in_bbox((1, 1, 3, 3), x, y)
+    assert (inbox.sum() == 9)
+    assert ((_in_bbox(box(1, 1, 3, 3), x, y) == inbox).all())
+    # points on the diagonal are on the boundary and are included
+    intri = _in_bbox(Polygon([(1, 1), (3, 1), (3, 3)]), x, y)
+    assert (intri.sum() == 6)
+    assert (not intri[3, 1] and intri[1, 3])
+
+
+def test_paths_to_level3_nworkers():
+    import tempfile
+    import numpy as np
+    grid = grid_example()
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        paths = example_paths(tmpdirname)
+        # A serial call first runs dask computations in this process; the
+        # pool must not inherit that state (it deadlocked with fork).
+        serial = readers.satellite.paths_to_level3(
+            paths, grid=grid, varkeys=('Val',)
+        )
+        pooled = readers.satellite.paths_to_level3(
+            paths, grid=grid, varkeys=('Val',), nworkers=2
+        )
+    assert (np.allclose(serial['Val'].values, pooled['Val'].values))
+    assert (serial['Val'].attrs['long_name'] == 'Val0')
+    assert (pooled['Val'].attrs['long_name'] == 'Val0')
+
+
+def test_paths_to_level3_mf():
+    import os
+    import tempfile
+    import numpy as np
+    grid = grid_example()
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        paths = example_paths(tmpdirname)
+        # a file with an extra variable does not share the schema, so
+        # paths_to_level3_mf applies to_level3 to each opened file
+        ds = dataset_example()
+        ds['Extra'] = ds['Val'] * 0
+        mixpath = os.path.join(tmpdirname, 'mixed.nc')
+        ds.to_netcdf(mixpath)
+        mixpaths = paths + [mixpath]
+        for testpaths in [paths, mixpaths]:
+            serial = readers.satellite.paths_to_level3(
+                testpaths, grid=grid, varkeys=('Val',)
+            )
+            mf = readers.satellite.paths_to_level3_mf(
+                testpaths, grid=grid, varkeys=('Val',)
+            )
+            assert (set(serial.data_vars) == set(mf.data_vars))
+            for key in serial.data_vars:
+                assert (np.allclose(serial[key], mf[key]))
+                assert (serial[key].attrs == mf[key].attrs)
+            assert ((serial['count'] == len(testpaths)).all())
+            assert (serial.attrs['history'] == mf.attrs['history'])
+
+
+def test_open_dataset_bbox():
+    import tempfile
+    import warnings
+    import numpy as np
+    grid = grid_example()
+    bbox = (-93, 41, -91, 42)
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        path = example_paths(tmpdirname, n=1)[0]
+        full = readers.satellite.open_dataset(path)
+        crop = readers.satellite.open_dataset(path, bbox=bbox)
+        # only the second scan line and the last two cross-track pixels
+        # have centers in bbox
+        assert (dict(crop.ds.sizes) == dict(nTimes=1, nXtrack=2))
+        fullds = full.ds.load()
+        assert (np.array_equal(
+            crop.ds['Val'].values, fullds['Val'][1:, 1:].values
+        ))
+        # uncropped with valid limited to bbox gives the same level3
+        swlon, swlat, nelon, nelat = bbox
+        fullds['valid'] = fullds['valid'] & (
+            (fullds['cn_x'] >= swlon) & (fullds['cn_x'] <= nelon)
+            & (fullds['cn_y'] >= swlat) & (fullds['cn_y'] <= nelat)
+        )
+        with warnings.catch_warnings(record=True):
+            ref = readers.satellite.from_dataset(fullds).to_level3(
+                'Val', grid=grid
+            )
+            out = crop.to_level3('Val', grid=grid)
+    for key in ['Val', 'weight_sum', 'count']:
+        assert (np.allclose(out[key].values, ref[key].values, equal_nan=True))
+    assert (np.isfinite(out['Val'].values).any())
@@ -76,3 +76,96 @@ def test_rootremover():
     assert (stem == '/really/long/testing')
     assert (short_list[0] == '{root}/1')
     assert (short_list[1] == '{root}/2')
+
+
+def test_grouped_weighted_avg():
+    import numpy as np
+    import pandas as pd
+    idx = pd.MultiIndex.from_arrays(
+        [[0, 0, 0, 1, 1, 2], [1, 1, 0, 0, 0, 0]], names=['ROW', 'COL']
+    )
+    df = pd.DataFrame(dict(
+        Val=[1., 3., np.nan, 2., 4., 5.],
+        weight=[1., 3., 1., 1., 1., 2.],
+    ), index=idx)
+    wdf = utils.grouped_weighted_avg(df, df['weight'], ['ROW', 'COL'])
+    # reference calculation with pandas groupby
+    gb = df['weight'].groupby(['ROW', 'COL'])
+    num = df.multiply(df['weight'], axis=0).groupby(['ROW', 'COL']).sum()
+    ref = num.divide(gb.sum(), axis=0)
+    assert (wdf.index.equals(ref.index))
+    assert (np.allclose(wdf['Val'], ref['Val']))
+    assert (np.allclose(wdf['weight'], ref['weight']))
+    assert (np.allclose(wdf['weight_sum'], gb.sum()))
+    assert (np.allclose(wdf['weight_mean'], gb.mean()))
+    assert ((wdf['count'] == gb.count()).all())
+
+
+def test_accumulated_avg():
+    import numpy as np
+    import pandas as pd
+    names = ['ROW', 'COL']
+    # (1, 0) is only in the first file and (1, 1) only in the second
+    df1 = pd.DataFrame(
+        dict(Val=[1., np.nan, 3.], weight_sum=[1., 2., 3.]),
+        index=pd.MultiIndex.from_tuples([(0, 0), (0, 1), (1, 0)], names=names)
+    )
+    df2 = pd.DataFrame(
+        dict(Val=[5., 6., 7.], weight_sum=[2., 1., 4.]),
+        index=pd.MultiIndex.from_tuples([(0, 0), (0, 1), (1, 1)], names=names)
+    )
+    cat = pd.concat([df1, df2])
+    acc = utils._accumulated_avg([df1, df2], 'weight_sum')
+    ref = utils.grouped_weighted_avg(cat, cat['weight_sum'], names)
+    assert (acc.index.equals(ref.index))
+    for key in ['Val', 'weight_sum', 'weight_mean']:
+        assert (np.allclose(acc[key], ref[key]))
+    assert ((acc['count'] == ref['count']).all())
+    acc = utils._accumulated_avg([df1[['Val']], df2[['Val']]])
+    ref = cat[['Val']].groupby(names).mean()
+    assert (acc.index.equals(ref.index))
+    assert (np.allclose(acc['Val'], ref['Val']))
+
+
+def test_cell_edges():
+    import numpy as np
+    a = np.array([[0., 2., 4.], [2., 4., 6.]])
+    edges = utils._cell_edges(a)
+    assert (edges.shape == (3, 4))
+    assert (np.allclose(edges[0], [0, 1, 3, 4]))
+    assert (np.allclose(edges[1], [1, 2, 4, 5]))
+    assert (np.allclose(edges[2], [2, 3, 5, 6]))
+    out = np.full((3, 4), np.nan)
+    assert (utils._cell_edges(a, out=out) is out)
+    assert (np.array_equal(out, edges))
+
+
+def test_coord_interp():
+    import numpy as np
+    import xarray as xr
+    rng = np.random.default_rng(0)
+    pin = np.sort(rng.uniform(100, 1000, (6, 10)), axis=-1)[:, ::-1]
+    # a missing and a non-monotonic column use numpy.interp directly
+    pin[1, 3] = np.nan
+    pin[2] = pin[2, ::-1]
+    pout = rng.uniform(50, 1100, (6, 4))
+    pout[0, 0] = np.nan
+    pout[3, 1] = pin[3, 2]
+    sw = rng.uniform(0, 2, (6, 10))
+    # exact hits next to missing data return the level value like np.interp
+    sw[4, 2] = np.nan
+    pout[4, :2] = pin[4, 1], pin[4, 3]
+    pout[5, 0] = pin[5, 0]
+    out = utils.coord_interp(
+        xr.DataArray(pout, dims=('pix', 'LAY')),
+        xr.DataArray(pin, dims=('pix', 'lev')),
+        xr.DataArray(sw, dims=('pix', 'lev')),
+        indim='lev', ascending=False
+    ).transpose('pix', 'LAY')
+    for i in range(6):
+        ref = np.interp(pout[i], pin[i, ::-1], sw[i, ::-1])
+        assert (np.array_equal(out.values[i], ref, equal_nan=True))
+    # xi at the last level is that level's value, not right
+    out = utils._interp_columns(sw[5, ::-1], pin[5, ::-1], pout[5], right=-1)
+    ref = np.interp(pout[5], pin[5, ::-1], sw[5, ::-1], right=-1)
+    assert (np.array_equal(out, ref, equal_nan=True))
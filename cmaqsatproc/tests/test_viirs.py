@@ -0,0 +1,92 @@
+from .. import readers
+
+
+def viirs_example_ds():
+    """
+    Small synthetic AERDT_L2_VIIRS_SNPP swath; lat/lon vary along both
+    dimensions so that corners are not trivial.
+    """
+    import numpy as np
+    import xarray as xr
+
+    nl, npx = 12, 9
+    line = np.arange(nl)[:, None]
+    pixel = np.arange(npx)[None, :]
+    lat = 30 + line * 0.5 + pixel * 0.1
+    lon = -100 + line * 0.2 + pixel * 0.6
+    aod = np.linspace(0, 1, nl * npx).reshape(nl, npx)
+    aod[0, 0] = np.nan
+    qa = (line + pixel) % 4
+    dims = ('number_of_lines_8x8', 'number_of_pixels_8x8')
+    return xr.Dataset(
+        dict(
+            latitude=(dims, lat), longitude=(dims, lon),
+            Optical_Depth_Land_And_Ocean=(dims, aod),
+            Land_Ocean_Quality_Flag=(dims, qa.astype('f4')),
+        ),
+        coords=dict(
+            number_of_lines_8x8=np.arange(nl),
+            number_of_pixels_8x8=np.arange(npx)
+        )
+    )
+
+
+def test_open_dataset_bbox():
+    import os
+    import tempfile
+    import numpy as np
+
+    cls = readers.viirs.AERDT_L2_VIIRS_SNPP
+    # crops lines and pixels on both sides of the swath
+    bbox = (-98.5, 31, -97, 33.5)
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        outpath = os.path.join(tmpdirname, 'testviirs.nc')
+        viirs_example_ds().to_netcdf(outpath)
+        full = cls.open_dataset(outpath).ds.load()
+        crop = cls.open_dataset(outpath, bbox=bbox).ds.load()
+        nocrn = cls.open_dataset(
+            outpath, bbox=bbox, with_corners=False
+        ).ds.load()
+
+    dims = ('number_of_lines_8x8', 'number_of_pixels_8x8')
+    assert (crop.sizes['number_of_lines_8x8'] < full.sizes[dims[0]])
+    assert (crop.sizes['number_of_pixels_8x8'] < full.sizes[dims[1]])
+    assert (crop.number_of_pixels_8x8.values[0] > 0)
+    assert (crop.number_of_pixels_8x8.values[-1] < full.sizes[dims[1]] - 1)
+    # Corners of kept pixels do not depend on the crop
+    sub = full.sel({dim: crop[dim] for dim in dims})
+    for key in ['ll_x', 'll_y', 'lu_x', 'lu_y', 'uu_x', 'uu_y', 'ul_x', 'ul_y']:
+        assert (np.array_equal(crop[key].values, sub[key].values))
+    assert (np.array_equal(crop['valid'].values, sub['valid'].values))
+    # with_corners=False crops the same way but skips corners
+    assert ('ll_x' not in nocrn.variables)
+    assert (dict(nocrn.sizes) == dict(crop.sizes))
+    assert (np.array_equal(nocrn['valid'].values, crop['valid'].values))
+
+
+def test_cmr_links_cache():
+    from unittest import mock
+    from ..readers import viirs
+
+    calls = []
+
+    def fakelinks(**kwds):
+        calls.append(kwds)
+        return ['https://x/opendap/a.nc.html', 'https://x/opendap/b.nc.html']
+
+    viirs._cmr_links.cache_clear()
+    with mock.patch.object(viirs, 'getcmrlinks', fakelinks):
+        cls = viirs.AERDT_L2_VIIRS_SNPP
+        links = cls.cmr_links(temporal='2020-01-01')
+        assert (links == ['https://x/opendap/a.nc', 'https://x/opendap/b.nc'])
+        # callers get their own list, so mutating it does not change the
+        # cached result
+        links.append('bad')
+        again = cls.cmr_links(temporal='2020-01-01')
+        assert (again == links[:-1])
+        assert (len(calls) == 1)
+        # unhashable keywords bypass the cache
+        cls.cmr_links(temporal='2020-01-01', bbox=[0, 0, 1, 1])
+        cls.cmr_links(temporal='2020-01-01', bbox=[0, 0, 1, 1])
+        assert (len(calls) == 3)
+    viirs._cmr_links.cache_clear()
@@ -24,21 +24,155 @@ def walk_groups(f, gkey, outputs=None):
     return outputs
 
 
+def _weighted_avg_fast(values, weights, group_ids, ngroups):
+    """
+    Single pass weighted sums by group using numpy.bincount.
+
+    Arguments
+    ---------
+    values : numpy.ndarray
+        Shape (n, m) values to be averaged
+    weights : numpy.ndarray
+        Shape (n,) weights for each row
+    group_ids : numpy.ndarray
+        Shape (n,) integer group for each row in [0, ngroups)
+    ngroups : int
+        Number of groups
+
+    Returns
+    -------
+    numerator, weight_sum, count : numpy.ndarray
+        Shapes (ngroups, m), (ngroups,) and (ngroups,). Missing values and
+        weights are skipped like pandas groupby sum and count.
+    """
+    import numpy as np
+
+    nvals = values.shape[1]
+    wvalid = ~np.isnan(weights)
+    weights = np.where(wvalid, weights, 0)
+    wvals = values * weights[:, None]
+    wvals[np.isnan(wvals)] = 0
+    # One bincount for all columns: each (group, column) pair is a bin
+    bins = (group_ids[:, None] * nvals + np.arange(nvals)).ravel()
+    numerator = np.bincount(
+        bins, weights=wvals.ravel(), minlength=ngroups * nvals
+    ).reshape(ngroups, nvals)
+    weight_sum = np.bincount(group_ids, weights=weights, minlength=ngroups)
+    count = np.bincount(group_ids, weights=wvalid, minlength=ngroups)
+    return numerator, weight_sum, count
+
+
+def _factorize_index(index, by):
+    """
+    Integer group ids for the levels by of index, sorted like groupby.
+
+    Each level is factorized separately and the level codes are combined
+    into one integer, so grouping is a linear scan instead of hashing
+    tuples of labels.
+
+    Returns
+    -------
+    group_ids : numpy.ndarray
+        Group of each row or -1 if any key is missing (like dropna=True)
+    outidx : pandas.Index or pandas.MultiIndex
+        Unique keys in group order
+    """
+    import numpy as np
+    import pandas as pd
+
+    levels = []
+    codes = []
+    for b in by:
+        lcodes, luniques = pd.factorize(index.get_level_values(b), sort=True)
+        codes.append(lcodes)
+        levels.append(luniques)
+    codes = np.stack(codes)
+    ingroup = (codes >= 0).all(axis=0)
+    shape = tuple(len(lev) for lev in levels)
+    flat = np.ravel_multi_index(codes[:, ingroup], shape)
+    uflat, inverse = np.unique(flat, return_inverse=True)
+    group_ids = np.full(codes.shape[1], -1, dtype='i8')
+    group_ids[ingroup] = inverse
+    ucodes = np.unravel_index(uflat, shape)
+    if len(by) == 1:
+        outidx = levels[0][ucodes[0]].rename(by[0])
+    else:
+        outidx = pd.MultiIndex.from_arrays(
+            [lev[uc] for lev, uc in zip(levels, ucodes)], names=by
+        )
+    return group_ids, outidx
+
+
 def grouped_weighted_avg(values, weights, by):
-    numerator = values.multiply(
-        weights, axis=0
-    ).groupby(by).sum()
-    wgb = weights.groupby(by)
-    denominator = wgb.sum()
-    simplemean = wgb.mean()
-    count = wgb.count()
-    outdf = numerator.divide(denominator, axis=0)
-    outdf['weight_sum'] = denominator
-    outdf['weight_mean'] = simplemean
-    outdf['count'] = count
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(by, str):
+        by = [by]
+    group_ids, outidx = _factorize_index(weights.index, by)
+    ingroup = group_ids >= 0
+    valkeys = values.columns[[k not in by for k in values.columns]]
+    numerator, denominator, count = _weighted_avg_fast(
+        values[valkeys].to_numpy(dtype='d')[ingroup],
+        weights.to_numpy(dtype='d')[ingroup],
+        group_ids[ingroup], len(outidx)
+    )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        outdf = pd.DataFrame(
+            numerator / denominator[:, None], index=outidx, columns=valkeys
+        )
+        outdf['weight_sum'] = denominator
+        outdf['weight_mean'] = denominator / count
+    outdf['count'] = count.astype('i8')
     return outdf
 
 
+def _accumulated_avg(dfs, weightkey=None):
+    """
+    Average several DataFrames that share index names by accumulating sums
+    one DataFrame at a time. Equivalent to concatenating dfs and applying
+    grouped_weighted_avg (or groupby().mean() when weightkey is None) by the
+    index names, without allocating the concatenated intermediate.
+
+    Arguments
+    ---------
+    dfs : iterable
+        pandas.DataFrames with the same columns and index names
+    weightkey : str or None
+        Column with weights. If None, an unweighted mean is returned.
+
+    Returns
+    -------
+    outdf : pandas.DataFrame
+    """
+    numerator = denominator = count = None
+    for df in dfs:
+        if weightkey is None:
+            wv = df.fillna(0)
+            w = df.notna().astype('i8')
+            c = w
+        else:
+            w = df[weightkey]
+            wv = df.multiply(w, axis=0).fillna(0)
+            c = w.notna().astype('i8')
+            w = w.fillna(0)
+        if numerator is None:
+            numerator, denominator, count = wv, w, c
+        else:
+            numerator = numerator.add(wv, fill_value=0)
+            denominator = denominator.add(w, fill_value=0)
+            count = count.add(c, fill_value=0)
+
+    if weightkey is None:
+        outdf = numerator / denominator
+    else:
+        outdf = numerator.divide(denominator, axis=0)
+        outdf[weightkey] = denominator
+        outdf['weight_mean'] = denominator / count
+        outdf['count'] = count.astype('i8')
+    return outdf.sort_index()
+
+
 def getcmrgranules(
     temporal, bbox=None, poly=None, verbose=0, **kwds
 ):
@@ -183,14 +317,24 @@ def EasyDataFramePolygon(df, wrap=True, progress=False, lowmem=False):
     wrap : bool
         If True (default), each polygon that crosses the dateline will be
         truncated to the Western portion.
+    progress : bool
+        If True and lowmem, print the percent of rows processed. Ignored
+        otherwise, because polygons are made in one vectorized call.
+    lowmem : bool
+        If True, make one Polygon per row instead of all at once.
 
     Returns
     -------
-    polys : list
-        List of shapely.geometry.Polygons
+    polys : list or array
+        List (lowmem) or array of shapely.geometry.Polygons
     """
     from shapely.geometry import Polygon
     import numpy as np
+    if not lowmem:
+        return _polygons_from_xy(
+            df[_xcrnrkeys].values, df[_ycrnrkeys].values, wrap=wrap
+        )
+
     x = df[_xcrnrkeys].copy()
     y = df[_ycrnrkeys].copy()
     dx = x.max(axis=1) - x.min(axis=1)
@@ -204,27 +348,95 @@ def EasyDataFramePolygon(df, wrap=True, progress=False, lowmem=False):
         newy = y
 
     polys = []
-    # Faster to convert all to values arrays first
-    if lowmem:
-        i = 0
-        for idx, x in newx.iterrows():
-            if progress:
-                print(f'\r{i/newx.shape[0]:8.3%}', end='')
-            y = newy.loc[idx]
-            polys.append(Polygon(np.asarray([x, y]).T))
-            i += 1
-    else:
-        xys = np.stack([newx.values, newy.values], axis=2)
-        for i, xy in enumerate(xys):
-            if progress:
-                print(f'\r{i/xys.shape[0]:8.3%}', end='')
-            polys.append(Polygon(xy))
+    i = 0
+    for idx, x in newx.iterrows():
+        if progress:
+            print(f'\r{i/newx.shape[0]:8.3%}', end='')
+        y = newy.loc[idx]
+        polys.append(Polygon(np.asarray([x, y]).T))
+        i += 1
     if progress:
         print('\r100.000%')
 
     return polys
 
 
+def _polygons_from_xy(x, y, wrap=True):
+    """
+    Vectorized construction of polygons from corner arrays. This is the fast
+    path of EasyDataFramePolygon: all polygons are created in one call to
+    shapely.polygons instead of one Polygon per row.
+
+    Arguments
+    ---------
+    x, y : array-like
+        Shape (N, 4) with corners ordered ll, lu, uu, ul
+    wrap : bool
+        If True (default), each polygon that crosses the dateline will be
+        truncated to the Western portion.
+
+    Returns
+    -------
+    polys : numpy.ndarray
+        Array of shapely.geometry.Polygons
+    """
+    import numpy as np
+    import shapely
+
+    x = np.asarray(x, dtype='d')
+    y = np.asarray(y, dtype='d')
+    if wrap:
+        # fmax/fmin skip missing corners like DataFrame.max/min
+        dx = np.fmax.reduce(x, axis=1) - np.fmin.reduce(x, axis=1)
+        x = np.where((dx > 90)[:, None] & (x > 0), -180, x)
+    return shapely.polygons(np.stack([x, y], axis=-1))
+
+
+def _cell_edges(a, out=None):
+    """
+    Pixel edges from pixel centers. Interior edges are the mean of the four
+    surrounding centers; boundary edges repeat the outermost centers, which
+    matches a linear interpolation clamped at the ends.
+
+    Arguments
+    ---------
+    a : array-like
+        Shape (..., M, N) pixel center values
+    out : numpy.ndarray or None
+        Optional (..., M + 1, N + 1) float array to write edges into, so that
+        callers processing many same-shaped granules can reuse one buffer.
+        Results held from a previous call are overwritten.
+
+    Returns
+    -------
+    edges : numpy.ndarray
+        Shape (..., M + 1, N + 1) pixel edge values (out, if provided)
+    """
+    import numpy as np
+
+    a = np.asarray(a)
+    *lead, m, n = a.shape
+    edgeshape = (*lead, m + 1, n + 1)
+    if out is not None and out.shape != edgeshape:
+        raise ValueError(f'out has shape {out.shape}; expected {edgeshape}')
+    # The stencil is separable: sum adjacent rows, then adjacent columns of
+    # the row sums, writing into preallocated outputs. Doubling the outer
+    # rows and columns is the same as repeating the edge centers.
+    rows = np.empty((*lead, m + 1, n), dtype=np.result_type(a, 0.25))
+    np.add(a[..., :-1, :], a[..., 1:, :], out=rows[..., 1:-1, :])
+    np.add(a[..., :1, :], a[..., :1, :], out=rows[..., :1, :])
+    np.add(a[..., -1:, :], a[..., -1:, :], out=rows[..., -1:, :])
+    if out is None:
+        edges = np.empty(edgeshape, dtype=rows.dtype)
+    else:
+        edges = out
+    np.add(rows[..., :-1], rows[..., 1:], out=edges[..., 1:-1])
+    np.add(rows[..., :1], rows[..., :1], out=edges[..., :1])
+    np.add(rows[..., -1:], rows[..., -1:], out=edges[..., -1:])
+    edges *= 0.25
+    return edges
+
+
 def rootremover(strlist, insert=False):
     """
     Find the longest common root and replace it with {root}
@@ -263,6 +475,104 @@ def rootremover(strlist, insert=False):
     return stem, short_strlist
 
 
+def _interp_block(fp, xp, xo, left, right):
+    """
+    Kernel for _interp_columns with levels first: fp and xp are (nin, npix)
+    and xo is (nout, npix). Returns (nout, npix).
+    """
+    import numpy as np
+
+    nin, npix = xp.shape
+    # idx is the number of x <= xi; same as searchsorted(side='right')
+    idx = np.zeros(xo.shape, dtype='i2')
+    le = np.empty(xo.shape, dtype='bool')
+    for li in range(nin):
+        np.less_equal(xp[li], xo, out=le)
+        idx += le
+    # flat positions of the lower bracketing level in xp and fp
+    flat = np.clip(idx - 1, 0, max(nin - 2, 0)).astype('intp')
+    flat *= npix
+    flat += np.arange(npix)
+    x0 = xp.ravel()[flat]
+    f0 = fp.ravel()[flat]
+    if nin > 1:
+        flat += npix
+        x1 = xp.ravel()[flat]
+        f1 = fp.ravel()[flat]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out = (f1 - f0) / (x1 - x0) * (xo - x0) + f0
+    else:
+        out = f0
+    np.copyto(out, fp[:1] if left is None else left, where=(idx == 0))
+    np.copyto(out, fp[-1:] if right is None else right, where=(idx == nin))
+    # Like numpy.interp, xi equal to a level returns that level's value
+    # (even the last level, and even if a neighbor is missing)
+    flat = np.maximum(idx - 1, 0).astype('intp')
+    flat *= npix
+    flat += np.arange(npix)
+    exact = (idx > 0) & (xp.ravel()[flat] == xo)
+    out[exact] = fp.ravel()[flat[exact]]
+    out[np.isnan(xo)] = np.nan
+    return out
+
+
+def _interp_columns(data, x, xi, left=None, right=None, blocksize=1024):
+    """
+    Equivalent to numpy.interp(xi, x, data) applied to every column, but
+    vectorized across columns. The search loops over the (few) input levels
+    instead of over the (many) columns, and columns are processed in blocks
+    that fit in cache. Columns whose x is not finite and strictly increasing,
+    or whose data are not finite, are passed to numpy.interp one at a time.
+
+    Arguments
+    ---------
+    data, x : array-like
+        Shape (..., nin) values and increasing coordinates
+    xi : array-like
+        Shape (..., nout) coordinates to interpolate to; leading dimensions
+        must broadcast with data and x
+    left, right : scalar
+        Values for xi below x[0] or above x[-1]; defaults are data[0] and
+        data[-1] as in numpy.interp
+    blocksize : int
+        Number of columns per block
+
+    Returns
+    -------
+    out : numpy.ndarray
+        Shape (..., nout) interpolated values
+    """
+    import numpy as np
+
+    data = np.asarray(data, dtype='d')
+    x = np.asarray(x, dtype='d')
+    xi = np.asarray(xi, dtype='d')
+    nin = x.shape[-1]
+    nout = xi.shape[-1]
+    lead = np.broadcast_shapes(data.shape[:-1], x.shape[:-1], xi.shape[:-1])
+    fp = np.broadcast_to(data, lead + (nin,)).reshape(-1, nin)
+    xp = np.broadcast_to(x, lead + (nin,)).reshape(-1, nin)
+    xo = np.broadcast_to(xi, lead + (nout,)).reshape(-1, nout)
+    npix = xp.shape[0]
+    out = np.empty((npix, nout), dtype='d')
+    for start in range(0, npix, blocksize):
+        blk = slice(start, start + blocksize)
+        # Levels first so each comparison runs over contiguous columns
+        out[blk] = _interp_block(
+            fp[blk].T.copy(), xp[blk].T.copy(), xo[blk].T.copy(), left, right
+        ).T
+    if nin < 2:
+        slow = np.ones(npix, dtype='bool')
+    else:
+        slow = ~(
+            np.isfinite(xp).all(-1) & (np.diff(xp, axis=-1) > 0).all(-1)
+            & np.isfinite(fp).all(-1)
+        )
+    for ci in np.flatnonzero(slow):
+        out[ci] = np.interp(xo[ci], xp[ci], fp[ci], left=left, right=right)
+    return out.reshape(lead + (nout,))
+
+
 def coord_interp(
     coordout, coordin, varin, verbose=0, interp='numpy',
     outdim='LAY', indim='LAY', ascending=True, **kwds
@@ -289,9 +599,14 @@ def coord_interp(
     import xarray as xr
     import numpy as np
 
+    vectorize = True
     if interp.lower() == 'numpy':
-        def interp1d(data, x, xi, **kwds):
-            return np.interp(xi, x, data, **kwds)
+        if set(kwds).issubset(('left', 'right')):
+            interp1d = _interp_columns
+            vectorize = False
+        else:
+            def interp1d(data, x, xi, **kwds):
+                return np.interp(xi, x, data, **kwds)
     else:
         def interp1d(data, x, xi, **kwds):
             from scipy import interpolate
@@ -309,7 +624,7 @@ def coord_interp(
         input_core_dims=[[indim], [indim], [tempdimname]],
         output_core_dims=[[tempdimname]],
         exclude_dims=set((indim,)),
-        vectorize=True,
+        vectorize=vectorize,
         kwargs=kwds
     )
     out = interped.rename(**{tempdimname: outdim})